@@ -0,0 +1,271 @@
+"""In-process response caching for the Wikidata client."""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+_MISSING = object()
+
+
+def make_key(params: Mapping[str, Any]) -> str:
+    """Build a canonical cache key from request parameters.
+
+    Keys are sorted, values are stringified and pipe-separated ID lists are
+    ordered, so that equivalent requests share a single cache entry.
+    """
+    canonical = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = "|".join(str(v) for v in value)
+        value = str(value)
+        if name == "ids":
+            value = "|".join(sorted(value.split("|")))
+        canonical[name] = value
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return ``(value, fresh)`` without dropping an expired entry.
+
+        Expired entries stay until evicted, so that they can be revalidated
+        instead of refetched.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        self._data.move_to_end(key)
+        return value, expires_at >= time.monotonic()
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class ResponseCache:
+    """TTL + LRU cache with hit/miss counters per namespace (usually the tool name).
+
+    Namespaces only partition the counters; entries are shared, so a response
+    fetched for one tool serves any other tool issuing the same request.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize, ttl)
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._cache.get(key, _MISSING)
+        counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        if value is _MISSING:
+            counters["misses"] += 1
+            return None
+        counters["hits"] += 1
+        return value
+
+    def get_stale(self, namespace: str, key: str) -> Tuple[Optional[Any], bool]:
+        """Like ``get``, but also return expired entries, flagged as not fresh."""
+        entry = self._cache.get_entry(key)
+        counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        if entry is None:
+            counters["misses"] += 1
+            return None, False
+        value, fresh = entry
+        if fresh:
+            counters["hits"] += 1
+        else:
+            counters["stale"] = counters.get("stale", 0) + 1
+        return value, fresh
+
+    def set(self, key: str, value: Any) -> None:
+        self._cache.set(key, value)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "namespaces": {name: dict(c) for name, c in self._stats.items()},
+        }
+
+
+class SparqlCache:
+    """TTL + LRU cache of SPARQL results, bounded by their serialized size.
+
+    Kept apart from the entity cache so that a few large result sets cannot
+    evict thousands of entities, and the other way round. Hits record the
+    bytes that did not have to be downloaded again.
+
+    JSON results can be registered as a LIMIT/OFFSET window of a base query,
+    so that a later request for another slice of the same query is answered
+    from the rows already cached.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._windows: Dict[str, Dict[str, Tuple[int, Optional[int]]]] = {}
+        self._bases: Dict[str, str] = {}
+        self._bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.bytes_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _counters(self, namespace: str) -> Dict[str, int]:
+        return self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+
+    def _live(self, key: str) -> Optional[Tuple[float, int, Any]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        counters = self._counters(namespace)
+        entry = self._live(key)
+        if entry is None:
+            counters["misses"] += 1
+            return None
+        self._data.move_to_end(key)
+        counters["hits"] += 1
+        self.bytes_saved += entry[1]
+        return entry[2]
+
+    def get_slice(
+        self, namespace: str, base: str, offset: int, limit: Optional[int]
+    ) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """Rows ``[offset, offset + limit)`` of ``base`` taken from cached windows.
+
+        Returns the sliced result and whether it covers the whole range; a
+        partial slice holds the leading rows, so that only the rest has to be
+        fetched. Returns ``None`` if no cached window contains ``offset``.
+        """
+        best: Optional[Tuple[str, Dict[str, Any], Optional[List[Any]], bool]] = None
+        for key, (window_offset, window_limit) in list(self._windows.get(base, {}).items()):
+            entry = self._live(key)
+            if entry is None or window_offset > offset:
+                continue
+            result = entry[2]
+            if "results" not in result:
+                # ASK results have no rows to slice.
+                if (window_offset, window_limit) == (offset, limit):
+                    best = (key, result, None, True)
+                    break
+                continue
+            rows = result["results"]["bindings"]
+            start = offset - window_offset
+            # A window that returned fewer rows than it asked for holds the
+            # end of the result set, unless reading was cut short.
+            complete = not result.get("truncated") and (
+                window_limit is None or len(rows) < window_limit
+            )
+            covered = complete or (limit is not None and start + limit <= len(rows))
+            if not covered and start >= len(rows):
+                continue
+            end = len(rows) if limit is None else min(len(rows), start + limit)
+            if best is None or (covered, end - start) > (best[3], len(best[2] or [])):
+                best = (key, result, rows[start:end], covered)
+            if covered:
+                break
+
+        if best is None:
+            self._counters(namespace)["misses"] += 1
+            return None
+        key, result, rows, covered = best
+        self._data.move_to_end(key)
+        counters = self._counters(namespace)
+        counter = "hits" if covered else "partial"
+        counters[counter] = counters.get(counter, 0) + 1
+        if rows is None:
+            self.bytes_saved += self._data[key][1]
+            return result, True
+        window_rows = len(result["results"]["bindings"]) or 1
+        self.bytes_saved += self._data[key][1] * len(rows) // window_rows
+        sliced = {name: value for name, value in result.items() if name != "truncated"}
+        sliced["results"] = {"bindings": rows}
+        return sliced, covered
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        base: Optional[str] = None,
+        window: Optional[Tuple[int, Optional[int]]] = None,
+    ) -> None:
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        if base is not None and window is not None:
+            self._windows.setdefault(base, {})[key] = window
+            self._bases[key] = base
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+        base = self._bases.pop(key, None)
+        if base is not None:
+            windows = self._windows[base]
+            del windows[key]
+            if not windows:
+                del self._windows[base]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._windows.clear()
+        self._bases.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(c["hits"] for c in self._stats.values())
+        lookups = hits + sum(c["misses"] for c in self._stats.values())
+        return {
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "bytes_saved": self.bytes_saved,
+            "namespaces": {name: dict(c) for name, c in self._stats.items()},
+        }
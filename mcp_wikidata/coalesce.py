@@ -0,0 +1,66 @@
+"""Single-flight coalescing of identical in-flight requests."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers using the same key.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same future instead of issuing their own request.
+    The call is cancelled as soon as every caller waiting for it has been
+    cancelled, so abandoned requests do not keep holding a connection.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict["asyncio.Future[Any]", int] = {}
+        self.calls = 0
+        self.saved = 0
+        self.abandoned = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.saved += 1
+        else:
+            self.calls += 1
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                # Last interested caller gone: stop the upstream request and
+                # let later callers start a fresh one.
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                future.cancel()
+                self.abandoned += 1
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    def _forget(self, key: str, future: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved even if every caller went away.
+            future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "upstream_calls": self.calls,
+            "saved": self.saved,
+            "abandoned": self.abandoned,
+            "in_flight": len(self),
+        }
@@ -2,12 +2,16 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 
+def _env_list(name: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
 class Config(BaseModel):
     user_agent: str = Field(
         default="MCP-Wikidata/0.1.0",
@@ -16,7 +20,17 @@ class Config(BaseModel):
     
     rate_limit: int = Field(
         default=60,
-        description="Maximum requests per minute"
+        description="Maximum requests per minute to the Wikibase API"
+    )
+    
+    sparql_rate_limit: int = Field(
+        default=60,
+        description="Maximum requests per minute to the SPARQL endpoint"
+    )
+    
+    rate_limit_burst: int = Field(
+        default=10,
+        description="Number of requests that may be sent back-to-back before rate limiting applies"
     )
     
     timeout: int = Field(
@@ -24,21 +38,171 @@ class Config(BaseModel):
         description="Request timeout in seconds"
     )
     
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 when the h2 package is installed"
+    )
+    
+    api_max_connections: int = Field(
+        default=20,
+        description="Connection pool size for the Wikibase API host"
+    )
+    
+    api_keepalive_expiry: float = Field(
+        default=60.0,
+        description="Seconds an idle Wikibase API connection is kept open"
+    )
+    
+    sparql_max_connections: int = Field(
+        default=10,
+        description="Connection pool size for the SPARQL endpoint host"
+    )
+    
+    sparql_keepalive_expiry: float = Field(
+        default=60.0,
+        description="Seconds an idle SPARQL endpoint connection is kept open"
+    )
+    
+    max_retries: int = Field(
+        default=3,
+        description="Maximum retries of a request after a 429/5xx response or a network error"
+    )
+    
+    retry_backoff: float = Field(
+        default=0.5,
+        description="Base delay in seconds of the exponential retry backoff"
+    )
+    
+    retry_backoff_max: float = Field(
+        default=30.0,
+        description="Maximum delay in seconds between two retries"
+    )
+    
+    retry_deadline: float = Field(
+        default=60.0,
+        description="Overall time budget in seconds for retries within one tool call"
+    )
+    
     cache_ttl: int = Field(
         default=3600,
         description="Cache TTL in seconds"
     )
     
+    cache_max_entries: int = Field(
+        default=2048,
+        description="Maximum number of responses kept in the in-memory cache"
+    )
+    
+    sparql_cache_ttl: int = Field(
+        default=3600,
+        description="TTL of cached SPARQL results in seconds"
+    )
+    
+    sparql_cache_max_bytes: int = Field(
+        default=64_000_000,
+        description="Maximum serialized size of cached SPARQL results in bytes"
+    )
+    
+    cache_path: Optional[str] = Field(
+        default=None,
+        description="Path of the persistent SQLite entity cache (disabled if unset)"
+    )
+    
+    prefix_index_max_terms: int = Field(
+        default=200_000,
+        description="Maximum labels and aliases kept in the local search prefix index"
+    )
+    
+    snapshot_path: Optional[str] = Field(
+        default=None,
+        description="Directory of a local entity snapshot built with mcp-wikidata-snapshot"
+    )
+    
+    disk_cache_ttl: int = Field(
+        default=604800,
+        description="TTL of persistent cache entries in seconds"
+    )
+    
+    revalidate: bool = Field(
+        default=True,
+        description="Revalidate expired cached entities against their latest revision instead of refetching them"
+    )
+    
+    prewarm_entities: List[str] = Field(
+        default_factory=list,
+        description="Entity IDs fetched into the cache in the background at startup"
+    )
+    
+    prewarm_properties: List[str] = Field(
+        default_factory=list,
+        description="Property IDs fetched into the cache in the background at startup"
+    )
+    
+    prewarm_queries: List[str] = Field(
+        default_factory=list,
+        description="SPARQL queries run at startup; {entity} templates run once per prewarm entity"
+    )
+    
     max_results: int = Field(
         default=50,
         description="Maximum number of results per request"
     )
     
+    sparql_max_rows: int = Field(
+        default=10000,
+        description="Maximum number of SPARQL result rows read from a response"
+    )
+    
+    sparql_max_bytes: int = Field(
+        default=50_000_000,
+        description="Maximum number of bytes read from a SPARQL response body"
+    )
+    
+    traverse_concurrency: int = Field(
+        default=4,
+        description="Maximum concurrent SPARQL queries per traverse frontier"
+    )
+    
+    max_concurrent_calls: int = Field(
+        default=16,
+        description="Maximum tool calls executed concurrently"
+    )
+    
+    lookup_concurrency: int = Field(
+        default=8,
+        description="Maximum concurrent get_entity/get_entities calls"
+    )
+    
+    search_concurrency: int = Field(
+        default=8,
+        description="Maximum concurrent search_entities calls"
+    )
+    
+    sparql_concurrency: int = Field(
+        default=5,
+        description="Maximum concurrent SPARQL-backed tool calls (WDQS allows 5 parallel queries per client)"
+    )
+    
+    call_queue_size: int = Field(
+        default=32,
+        description="Maximum tool calls waiting per lane before new calls are rejected"
+    )
+    
     sparql_endpoint: str = Field(
         default="https://query.wikidata.org/sparql",
         description="SPARQL endpoint URL"
     )
     
+    sparql_guard: str = Field(
+        default="warn",
+        description="Query cost guard: enforce (reject prohibitive queries), warn (log only) or off"
+    )
+    
+    sparql_heavy_endpoint: Optional[str] = Field(
+        default=None,
+        description="SPARQL endpoint for queries estimated as expensive (defaults to sparql_endpoint)"
+    )
+    
     wikibase_api_url: str = Field(
         default="https://www.wikidata.org/w/api.php",
         description="Wikibase API endpoint URL"
@@ -48,6 +212,11 @@ class Config(BaseModel):
         default="en",
         description="Default language code"
     )
+    
+    compact_json: bool = Field(
+        default=True,
+        description="Serialize tool results as minified JSON instead of indented JSON"
+    )
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -56,18 +225,57 @@ class Config(BaseModel):
         return cls(
             user_agent=os.getenv("WIKIDATA_USER_AGENT", "MCP-Wikidata/0.1.0"),
             rate_limit=int(os.getenv("WIKIDATA_RATE_LIMIT", "60")),
+            sparql_rate_limit=int(os.getenv("WIKIDATA_SPARQL_RATE_LIMIT", "60")),
+            rate_limit_burst=int(os.getenv("WIKIDATA_RATE_LIMIT_BURST", "10")),
             timeout=int(os.getenv("WIKIDATA_TIMEOUT", "30")),
+            http2=os.getenv("WIKIDATA_HTTP2", "false").lower() in ("1", "true", "yes"),
+            api_max_connections=int(os.getenv("WIKIDATA_API_MAX_CONNECTIONS", "20")),
+            api_keepalive_expiry=float(os.getenv("WIKIDATA_API_KEEPALIVE_EXPIRY", "60")),
+            sparql_max_connections=int(os.getenv("WIKIDATA_SPARQL_MAX_CONNECTIONS", "10")),
+            sparql_keepalive_expiry=float(
+                os.getenv("WIKIDATA_SPARQL_KEEPALIVE_EXPIRY", "60")
+            ),
+            max_retries=int(os.getenv("WIKIDATA_MAX_RETRIES", "3")),
+            retry_backoff=float(os.getenv("WIKIDATA_RETRY_BACKOFF", "0.5")),
+            retry_backoff_max=float(os.getenv("WIKIDATA_RETRY_BACKOFF_MAX", "30")),
+            retry_deadline=float(os.getenv("WIKIDATA_RETRY_DEADLINE", "60")),
             cache_ttl=int(os.getenv("WIKIDATA_CACHE_TTL", "3600")),
+            cache_max_entries=int(os.getenv("WIKIDATA_CACHE_MAX_ENTRIES", "2048")),
+            sparql_cache_ttl=int(os.getenv("WIKIDATA_SPARQL_CACHE_TTL", "3600")),
+            sparql_cache_max_bytes=int(
+                os.getenv("WIKIDATA_SPARQL_CACHE_MAX_BYTES", "64000000")
+            ),
+            cache_path=os.getenv("WIKIDATA_CACHE_PATH") or None,
+            prefix_index_max_terms=int(
+                os.getenv("WIKIDATA_PREFIX_INDEX_MAX_TERMS", "200000")
+            ),
+            snapshot_path=os.getenv("WIKIDATA_SNAPSHOT_PATH") or None,
+            disk_cache_ttl=int(os.getenv("WIKIDATA_DISK_CACHE_TTL", "604800")),
+            revalidate=os.getenv("WIKIDATA_REVALIDATE", "true").lower() in ("1", "true", "yes"),
+            prewarm_entities=_env_list("WIKIDATA_PREWARM_ENTITIES"),
+            prewarm_properties=_env_list("WIKIDATA_PREWARM_PROPERTIES"),
             max_results=int(os.getenv("WIKIDATA_MAX_RESULTS", "50")),
+            sparql_max_rows=int(os.getenv("WIKIDATA_SPARQL_MAX_ROWS", "10000")),
+            sparql_max_bytes=int(os.getenv("WIKIDATA_SPARQL_MAX_BYTES", "50000000")),
+            traverse_concurrency=int(os.getenv("WIKIDATA_TRAVERSE_CONCURRENCY", "4")),
+            max_concurrent_calls=int(os.getenv("WIKIDATA_MAX_CONCURRENT_CALLS", "16")),
+            lookup_concurrency=int(os.getenv("WIKIDATA_LOOKUP_CONCURRENCY", "8")),
+            search_concurrency=int(os.getenv("WIKIDATA_SEARCH_CONCURRENCY", "8")),
+            sparql_concurrency=int(os.getenv("WIKIDATA_SPARQL_CONCURRENCY", "5")),
+            call_queue_size=int(os.getenv("WIKIDATA_CALL_QUEUE_SIZE", "32")),
             sparql_endpoint=os.getenv(
                 "WIKIDATA_SPARQL_ENDPOINT", 
                 "https://query.wikidata.org/sparql"
             ),
+            sparql_guard=os.getenv("WIKIDATA_SPARQL_GUARD", "warn"),
+            sparql_heavy_endpoint=os.getenv("WIKIDATA_SPARQL_HEAVY_ENDPOINT") or None,
             wikibase_api_url=os.getenv(
                 "WIKIDATA_API_URL", 
                 "https://www.wikidata.org/w/api.php"
             ),
             default_language=os.getenv("WIKIDATA_DEFAULT_LANGUAGE", "en"),
+            compact_json=os.getenv("WIKIDATA_COMPACT_JSON", "true").lower()
+            in ("1", "true", "yes"),
         )
 
     @classmethod
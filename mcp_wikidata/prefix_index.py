@@ -0,0 +1,116 @@
+"""In-process label/alias prefix index for search_entities."""
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from .snapshot import normalize
+
+
+class PrefixIndex:
+    """Per-language sorted arrays of normalized labels and aliases.
+
+    Prefix queries are answered by binary search. The index fills up from
+    every entity and search result the server sees, up to ``max_terms``.
+    """
+
+    def __init__(self, max_terms: int) -> None:
+        self.max_terms = max_terms
+        self._terms: Dict[str, List[Tuple[str, str]]] = {}
+        self._names: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(
+        self,
+        entity_id: str,
+        language: str,
+        texts: List[str],
+        label: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> None:
+        if self._size >= self.max_terms:
+            return
+        names = self._names.setdefault((entity_id, language), {})
+        if label:
+            names["label"] = label
+        if description:
+            names["description"] = description
+
+        terms = self._terms.setdefault(language, [])
+        for text in texts:
+            if self._size >= self.max_terms:
+                return
+            term = (normalize(text), entity_id)
+            if not term[0]:
+                continue
+            pos = bisect_left(terms, term)
+            if pos < len(terms) and terms[pos] == term:
+                continue
+            insort(terms, term)
+            self._size += 1
+
+    def add_entity(self, entity: Dict[str, Any]) -> None:
+        entity_id = entity.get("id")
+        if not entity_id:
+            return
+        labels = entity.get("labels", {})
+        descriptions = entity.get("descriptions", {})
+        aliases = entity.get("aliases", {})
+        for language in set(labels) | set(aliases):
+            label = labels.get(language, {}).get("value")
+            texts = [label] if label else []
+            texts += [alias["value"] for alias in aliases.get(language, [])]
+            self.add(
+                entity_id,
+                language,
+                texts,
+                label,
+                descriptions.get(language, {}).get("value"),
+            )
+
+    def search(
+        self, text: str, language: str, limit: int, type: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Entities of ``type`` (items by default) with a label or alias starting
+        with ``text``, best matches first."""
+        prefix = normalize(text)
+        terms = self._terms.get(language, [])
+        # Like wbsearchentities, search items unless told otherwise.
+        kind = {"item": "Q", "property": "P"}.get(type or "item")
+
+        # Collect a few more candidates than needed so that exact and short
+        # matches can be ranked before longer ones.
+        candidates: Dict[str, Tuple[bool, int]] = {}
+        pos = bisect_left(terms, (prefix, ""))
+        while pos < len(terms) and len(candidates) < limit * 4:
+            term, entity_id = terms[pos]
+            if not term.startswith(prefix):
+                break
+            pos += 1
+            if kind and not entity_id.startswith(kind):
+                continue
+            rank = (term != prefix, len(term))
+            if entity_id not in candidates or rank < candidates[entity_id]:
+                candidates[entity_id] = rank
+
+        ranked = sorted(candidates, key=lambda entity_id: candidates[entity_id])[:limit]
+        if ranked:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return [
+            {"id": entity_id, **self._names.get((entity_id, language), {})}
+            for entity_id in ranked
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "terms": self._size,
+            "max_terms": self.max_terms,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
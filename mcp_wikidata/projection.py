@@ -0,0 +1,188 @@
+"""Field projection and size budgets for Wikibase entity payloads."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .serialization import dumps
+
+# Sections kept in full before claims; anything else is only added if it fits.
+# property_labels is the small ID -> label map of simplified entities.
+_CORE_FIELDS = (
+    "type", "id", "title", "lastrevid", "modified", "labels", "descriptions",
+    "property_labels",
+)
+_OPTIONAL_SECTIONS = ("aliases", "sitelinks")
+
+
+def _size(value: Any) -> int:
+    return len(dumps(value).encode("utf-8"))
+
+
+def _property_order(property_id: str) -> Tuple[str, int]:
+    number = property_id[1:]
+    return property_id[:1], int(number) if number.isdigit() else 0
+
+
+def project_entity(
+    entity: Dict[str, Any],
+    claims: Optional[List[str]] = None,
+    max_statements: Optional[int] = None,
+    include_references: bool = True,
+    include_qualifiers: bool = True,
+) -> Dict[str, Any]:
+    """Return a copy of ``entity`` restricted to the requested statements.
+
+    The input is never modified, so cached entities can be projected safely.
+    """
+    if "claims" not in entity or (
+        not claims and max_statements is None and include_references and include_qualifiers
+    ):
+        return entity
+
+    wanted = set(claims) if claims else None
+    projected_claims = {}
+    for property_id, statements in entity["claims"].items():
+        if wanted is not None and property_id not in wanted:
+            continue
+        if max_statements is not None:
+            statements = statements[:max_statements]
+        if not statements:
+            continue
+        if not include_references or not include_qualifiers:
+            statements = [
+                _strip_statement(statement, include_references, include_qualifiers)
+                for statement in statements
+            ]
+        projected_claims[property_id] = statements
+
+    return {**entity, "claims": projected_claims}
+
+
+def _strip_statement(
+    statement: Dict[str, Any], include_references: bool, include_qualifiers: bool
+) -> Dict[str, Any]:
+    stripped = dict(statement)
+    if not include_references:
+        stripped.pop("references", None)
+    if not include_qualifiers:
+        stripped.pop("qualifiers", None)
+        stripped.pop("qualifiers-order", None)
+    return stripped
+
+
+def truncate_to_budget(
+    entity: Dict[str, Any], max_bytes: int, claims_key: str = "claims"
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Fit ``entity`` into ``max_bytes`` of serialized JSON.
+
+    Truncation is deterministic: core fields are always kept, then statements
+    are added property by property in ID order until the budget is reached,
+    then aliases and sitelinks if they still fit. Returns the truncated entity
+    and a description of what was left out, or ``None`` if nothing was.
+    """
+    if _size(entity) <= max_bytes:
+        return entity, None
+
+    result = {key: entity[key] for key in _CORE_FIELDS if key in entity}
+    budget = max_bytes - _size(result)
+    omitted: List[str] = []
+    truncated_properties: List[str] = []
+
+    claims = entity.get(claims_key, {})
+    kept_claims: Dict[str, List[Any]] = {}
+    budget -= len(claims_key) + 6
+    exhausted = False
+    for property_id in sorted(claims, key=_property_order):
+        statements = claims[property_id]
+        if exhausted:
+            truncated_properties.append(property_id)
+            continue
+        kept = []
+        budget -= len(property_id) + 6
+        for statement in statements:
+            cost = _size(statement) + 1
+            if cost > budget:
+                exhausted = True
+                break
+            kept.append(statement)
+            budget -= cost
+        if kept:
+            kept_claims[property_id] = kept
+        if len(kept) < len(statements):
+            truncated_properties.append(property_id)
+    result[claims_key] = kept_claims
+
+    for section in _OPTIONAL_SECTIONS:
+        if section not in entity:
+            continue
+        cost = _size(entity[section]) + len(section) + 4
+        if cost <= budget:
+            result[section] = entity[section]
+            budget -= cost
+        else:
+            omitted.append(section)
+
+    for key in entity:
+        if key not in result and key not in omitted:
+            omitted.append(key)
+
+    return result, {
+        "max_bytes": max_bytes,
+        "omitted_sections": omitted,
+        "truncated_properties": truncated_properties,
+    }
+
+
+_TERM_SECTIONS = ("labels", "descriptions", "aliases")
+_INFO_FIELDS = ("pageid", "ns", "title", "lastrevid", "modified")
+
+
+def _is_fallback(value: Any) -> bool:
+    if isinstance(value, list):
+        return any("for-language" in item for item in value)
+    return "for-language" in value
+
+
+def filter_entity(
+    entity: Dict[str, Any],
+    languages: Optional[str],
+    props: Optional[str],
+    fallback: bool = True,
+) -> Dict[str, Any]:
+    """Restrict a full entity the way ``wbgetentities`` does for ``languages``/``props``.
+
+    Both arguments use the API's pipe-separated syntax. Used when an entity is
+    served from a local source holding complete entities. Unless ``fallback``
+    is set, terms that ``languagefallback`` borrowed from another language are
+    dropped.
+    """
+    filtered = dict(entity)
+    if props:
+        wanted = set(props.split("|"))
+        for key in list(filtered):
+            if key in ("id", "type"):
+                continue
+            section = "info" if key in _INFO_FIELDS else key
+            if section not in wanted and not (
+                section == "sitelinks" and "sitelinks/urls" in wanted
+            ):
+                del filtered[key]
+    if languages or not fallback:
+        wanted_languages = set(languages.split("|")) if languages else None
+        for section in _TERM_SECTIONS:
+            if section in filtered:
+                filtered[section] = {
+                    lang: value for lang, value in filtered[section].items()
+                    if (wanted_languages is None or lang in wanted_languages)
+                    and (fallback or not _is_fallback(value))
+                }
+    return filtered
+
+
+def merge_terms(entity: Dict[str, Any], terms: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of ``entity`` with the labels, descriptions and aliases of
+    ``terms`` (another response for the same entity) added or replaced."""
+    merged = dict(entity)
+    for section in _TERM_SECTIONS:
+        if section in terms:
+            merged[section] = {**entity.get(section, {}), **terms[section]}
+    return merged
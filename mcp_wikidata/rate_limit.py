@@ -0,0 +1,64 @@
+"""Token-bucket rate limiting for upstream Wikidata endpoints."""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+
+class TokenBucket:
+    """Requests-per-minute limiter with a small burst allowance.
+
+    Waiters are served in arrival order: ``asyncio.Lock`` wakes them FIFO, so a
+    request never fails because of the limit, it only queues.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1) -> None:
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.waiting = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            self.acquired += 1
+            return
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.001:
+            self.delayed += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.rate * 60,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
@@ -0,0 +1,163 @@
+"""Retry policy with exponential backoff for transient upstream failures."""
+
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import httpx
+
+from .rate_limit import TokenBucket
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_ERRORS: Tuple[Type[Exception], ...] = (httpx.TimeoutException, httpx.NetworkError)
+
+# On WDQS a read timeout or a 500 usually means the query itself is too slow,
+# and the server keeps running the abandoned query: sending it again only
+# doubles the load. Only retry when the query never reached the server or
+# the service was temporarily unavailable.
+SPARQL_RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+SPARQL_RETRYABLE_ERRORS: Tuple[Type[Exception], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_deadline: ContextVar[Optional[float]] = ContextVar("wikidata_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Bound the total time retries may spend within the enclosed block.
+
+    Nested scopes can only shorten the deadline of the enclosing one.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Retry idempotent requests on 429/5xx responses and transport errors.
+
+    ``Retry-After`` is honoured when present, otherwise the delay is drawn
+    with full jitter from an exponentially growing window. A retry is only
+    attempted if it fits in the deadline set by :func:`deadline_scope`.
+    ``status_codes`` and ``errors`` select what counts as transient.
+    """
+
+    def __init__(
+        self,
+        max_retries: int,
+        backoff: float,
+        backoff_max: float,
+        status_codes: FrozenSet[int] = RETRYABLE_STATUS_CODES,
+        errors: Tuple[Type[Exception], ...] = RETRYABLE_ERRORS,
+    ) -> None:
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.status_codes = status_codes
+        self.errors = errors
+        self.retries = 0
+        self.exhausted = 0
+        self.backoff_seconds_total = 0.0
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def _can_retry(self, method: str, attempt: int, delay: float) -> bool:
+        if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+            return False
+        budget = remaining_budget()
+        return budget is None or delay < budget
+
+    def _give_up(self, attempt: int) -> None:
+        if attempt:
+            self.exhausted += 1
+
+    async def send(
+        self,
+        method: str,
+        request: Callable[[], Awaitable[httpx.Response]],
+        limiter: TokenBucket,
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            try:
+                response = await request()
+            except self.errors:
+                delay = self._delay(attempt, None)
+                if not self._can_retry(method, attempt, delay):
+                    self._give_up(attempt)
+                    raise
+            else:
+                if response.status_code not in self.status_codes:
+                    return response
+                delay = self._delay(
+                    attempt, parse_retry_after(response.headers.get("Retry-After"))
+                )
+                if not self._can_retry(method, attempt, delay):
+                    self._give_up(attempt)
+                    return response
+                await response.aclose()
+
+            self.retries += 1
+            self.backoff_seconds_total += delay
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+            "backoff_seconds_total": round(self.backoff_seconds_total, 3),
+        }
@@ -0,0 +1,128 @@
+"""Concurrency lanes and priorities for tool calls."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+
+class Lane:
+    """One class of tool calls with its own concurrency limit and bounded queue."""
+
+    def __init__(self, name: str, priority: int, concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.priority = priority
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.running = 0
+        self.queue: Deque["asyncio.Future[None]"] = deque()
+        self.admitted = 0
+        self.shed = 0
+        self.queue_depth_max = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "queue_depth": len(self.queue),
+            "queue_depth_max": self.queue_depth_max,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+
+class Scheduler:
+    """Shared worker pool fed from per-class lanes.
+
+    A call runs at once if its lane and the pool both have a free slot;
+    otherwise it waits in its lane's queue. A freed slot goes to the waiting
+    call of the highest-priority lane that is under its own limit, so quick
+    lookups and searches overtake queued SPARQL queries, and a lane limit
+    below the pool size keeps slots free for the other lanes. A call arriving
+    at a full queue is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, workers: int, lanes: List[Lane]) -> None:
+        self.workers = max(1, workers)
+        self.running = 0
+        self.lanes = {lane.name: lane for lane in lanes}
+        self._by_priority = sorted(lanes, key=lambda lane: lane.priority)
+
+    async def run(self, lane_name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lane = self.lanes[lane_name]
+        await self._acquire(lane)
+        try:
+            return await func()
+        finally:
+            self._release(lane)
+
+    async def _acquire(self, lane: Lane) -> None:
+        if not lane.queue and lane.running < lane.concurrency and self.running < self.workers:
+            self._start(lane)
+            return
+
+        if len(lane.queue) >= lane.max_queue:
+            lane.shed += 1
+            raise Exception(
+                f"Server busy: {len(lane.queue)} {lane.name} calls already queued. "
+                "Please try again later."
+            )
+
+        started = time.monotonic()
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        lane.queue.append(waiter)
+        lane.queue_depth_max = max(lane.queue_depth_max, len(lane.queue))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.cancelled():
+                # The slot was granted just before the cancellation; pass it on.
+                self._release(lane)
+            elif waiter in lane.queue:
+                lane.queue.remove(waiter)
+            raise
+
+        waited = time.monotonic() - started
+        lane.wait_seconds_total += waited
+        lane.wait_seconds_max = max(lane.wait_seconds_max, waited)
+
+    def _start(self, lane: Lane) -> None:
+        lane.running += 1
+        lane.admitted += 1
+        self.running += 1
+
+    def _release(self, lane: Lane) -> None:
+        lane.running -= 1
+        self.running -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.running < self.workers:
+            lane = next(
+                (
+                    lane for lane in self._by_priority
+                    if lane.queue and lane.running < lane.concurrency
+                ),
+                None,
+            )
+            if lane is None:
+                return
+            waiter = lane.queue.popleft()
+            if waiter.cancelled():
+                continue
+            self._start(lane)
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queue_depth": sum(len(lane.queue) for lane in self.lanes.values()),
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+        }
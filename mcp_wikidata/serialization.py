@@ -0,0 +1,26 @@
+"""JSON serialization of tool results."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def dumps(obj: Any, compact: bool = True) -> str:
+    """Serialize ``obj`` to JSON, using orjson when it is installed.
+
+    Compact output drops all insignificant whitespace; otherwise the result is
+    indented with two spaces. Values JSON cannot represent are stringified.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option, default=str).decode("utf-8")
+
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=str)
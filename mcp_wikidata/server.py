@@ -33,19 +33,30 @@ class WikidataServer:
         async def handle_call_tool(name: str, arguments: dict[str, Any]) -> Any:
             return await self.tools.call_tool(name, arguments)
 
+    async def _warm_up(self) -> None:
+        await self.tools.client.warm_up()
+        await self.tools.client.prewarm()
+
     async def run(self) -> None:
-        async with stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="mcp-wikidata",
-                    server_version="0.1.0",
-                    capabilities=ServerCapabilities(
-                        tools={}
+        # Warm up connections and caches in the background so the initialize
+        # handshake is never delayed by network setup.
+        warm_up = asyncio.create_task(self._warm_up())
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="mcp-wikidata",
+                        server_version="0.1.0",
+                        capabilities=ServerCapabilities(
+                            tools={}
+                        ),
                     ),
-                ),
-            )
+                )
+        finally:
+            warm_up.cancel()
+            await self.tools.client.aclose()
 
 
 @click.command()
@@ -63,7 +74,7 @@ class WikidataServer:
 def main(config_file: str | None = None, log_level: str = "INFO") -> None:
     logging.basicConfig(level=getattr(logging, log_level))
     
-    config = Config.from_file(config_file) if config_file else Config()
+    config = Config.from_file(config_file)
     server = WikidataServer(config)
     
     try:
@@ -0,0 +1,371 @@
+"""Local entity snapshot built from Wikidata JSON dumps.
+
+A snapshot is a directory holding five files:
+
+- ``meta.json``: the build's options, such as the languages it kept;
+- ``records.bin``: zlib-compressed entity JSON records, back to back;
+- ``index.bin``: fixed-width ``(kind, number, offset, length)`` entries sorted
+  by entity ID, binary-searched through ``mmap``;
+- ``labels.tsv``: sorted ``language, normalized text, ID, label`` lines for
+  labels and aliases, used for prefix search;
+- ``claims.tsv``: sorted ``property, value, ID`` lines for string and
+  external identifier values, used for exact ``find_by_property`` lookups.
+
+The data files are memory-mapped, so opening a snapshot is instant and lookups
+only touch the pages they need. The index and the sorted files are built with
+an external merge sort, so building from a dump of millions of entities needs
+bounded memory.
+"""
+
+import bz2
+import gzip
+import heapq
+import json
+import logging
+import mmap
+import re
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import click
+
+logger = logging.getLogger(__name__)
+
+_INDEX_ENTRY = struct.Struct("<cQQI")
+_ENTITY_ID = re.compile(r"^([A-Z])([1-9][0-9]*)$")
+
+# Statement datatypes stored as plain string literals in the RDF, the only
+# values ``?item wdt:P "value"`` matches on the live endpoint.
+_STRING_DATATYPES = ("string", "external-id")
+
+# Lines sorted in memory before being spilled to a temporary run file.
+_RUN_LINES = 500_000
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _clean(text: str) -> str:
+    return text.replace("\t", " ").replace("\n", " ")
+
+
+def _split_id(entity_id: str) -> Optional[Tuple[bytes, int]]:
+    match = _ENTITY_ID.match(entity_id)
+    if not match:
+        return None
+    return match.group(1).encode("ascii"), int(match.group(2))
+
+
+def _open_dump(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_dump(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield entities from a ``latest-all.json`` style dump (one entity per line)."""
+    with _open_dump(path) as dump:
+        for line in dump:
+            line = line.strip().rstrip(b",")
+            if line in (b"", b"[", b"]"):
+                continue
+            yield json.loads(line)
+
+
+def _statement_values(entity: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    for prop_id, statements in entity.get("claims", {}).items():
+        for statement in statements:
+            mainsnak = statement.get("mainsnak", {})
+            value = mainsnak.get("datavalue", {}).get("value")
+            if isinstance(value, str) and mainsnak.get("datatype") in _STRING_DATATYPES:
+                yield prop_id, value
+
+
+class _ExternalSort:
+    """Sort and deduplicate lines that may not fit in memory.
+
+    Lines are buffered, sorted as UTF-8 bytes and spilled to temporary run
+    files every ``run_lines`` lines; ``write_to`` merges the runs with
+    ``heapq.merge``.
+    """
+
+    def __init__(self, directory: str, run_lines: int) -> None:
+        self._directory = directory
+        self._run_lines = run_lines
+        self._buffer: List[bytes] = []
+        self._runs: List[str] = []
+
+    def add(self, line: str) -> None:
+        self._buffer.append(line.encode("utf-8"))
+        if len(self._buffer) >= self._run_lines:
+            self._spill()
+
+    def _spill(self) -> None:
+        self._buffer.sort()
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self._directory, suffix=".run", delete=False
+        ) as run:
+            run.writelines(self._buffer)
+            self._runs.append(run.name)
+        self._buffer = []
+
+    def merged(self) -> Iterator[bytes]:
+        """Yield every distinct line in order, removing the run files."""
+        self._buffer.sort()
+        runs = [open(name, "rb") for name in self._runs]
+        try:
+            previous = None
+            for line in heapq.merge(self._buffer, *runs):
+                if line != previous:
+                    yield line
+                    previous = line
+        finally:
+            for run in runs:
+                run.close()
+                Path(run.name).unlink()
+
+    def write_to(self, path: Path) -> None:
+        with open(path, "wb") as output:
+            output.writelines(self.merged())
+
+
+def build_snapshot(
+    dump_path: str,
+    output_dir: str,
+    ids: Optional[Set[str]] = None,
+    languages: Optional[Set[str]] = None,
+) -> int:
+    """Build a snapshot from a dump, optionally restricted to IDs and languages.
+
+    Returns the number of entities written.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    with tempfile.TemporaryDirectory(dir=output) as scratch:
+        index = _ExternalSort(scratch, _RUN_LINES)
+        labels = _ExternalSort(scratch, _RUN_LINES)
+        claims = _ExternalSort(scratch, _RUN_LINES)
+        with open(output / "records.bin", "wb") as records:
+            _write_records(dump_path, records, index, labels, claims, ids, languages)
+        # Sorted on UTF-8 bytes, the order in which the mmapped files are searched.
+        labels.write_to(output / "labels.tsv")
+        claims.write_to(output / "claims.tsv")
+        with open(output / "index.bin", "wb") as index_file:
+            for line in index.merged():
+                kind, number, offset, length = line.split(b"\t")
+                index_file.write(
+                    _INDEX_ENTRY.pack(kind, int(number), int(offset), int(length))
+                )
+                count += 1
+
+    meta = {"languages": sorted(languages) if languages is not None else None}
+    (output / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    return count
+
+
+def _write_records(
+    dump_path: str,
+    records: IO[bytes],
+    index: _ExternalSort,
+    labels: _ExternalSort,
+    claims: _ExternalSort,
+    ids: Optional[Set[str]],
+    languages: Optional[Set[str]],
+) -> None:
+    offset = 0
+    for entity in iter_dump(dump_path):
+        entity_id = entity.get("id", "")
+        key = _split_id(entity_id)
+        if key is None or (ids is not None and entity_id not in ids):
+            continue
+
+        if languages is not None:
+            for section in ("labels", "descriptions", "aliases"):
+                if section in entity:
+                    entity[section] = {
+                        lang: value for lang, value in entity[section].items()
+                        if lang in languages
+                    }
+
+        blob = zlib.compress(
+            json.dumps(entity, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        )
+        records.write(blob)
+        # Zero-padded numbers sort numerically as text.
+        index.add(f"{entity_id[0]}\t{key[1]:020d}\t{offset}\t{len(blob)}\n")
+        offset += len(blob)
+
+        entity_labels = {
+            lang: label["value"] for lang, label in entity.get("labels", {}).items()
+        }
+        texts = list(entity_labels.items())
+        texts += [
+            (lang, alias["value"])
+            for lang, aliases in entity.get("aliases", {}).items()
+            for alias in aliases
+        ]
+        for lang, text in texts:
+            # Alias matches show the entity's label, like wbsearchentities.
+            label = entity_labels.get(lang, text)
+            labels.add(f"{lang}\t{_clean(normalize(text))}\t{entity_id}\t{_clean(label)}\n")
+        for prop_id, value in _statement_values(entity):
+            claims.add(f"{prop_id}\t{_clean(value)}\t{entity_id}\n")
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _first_line_at_or_after(mm: mmap.mmap, key: bytes) -> int:
+    """Offset of the first line of a sorted file that is >= ``key``."""
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mm.rfind(b"\n", 0, mid) + 1
+        end = mm.find(b"\n", start)
+        end = len(mm) if end == -1 else end
+        if mm[start:end] < key:
+            lo = end + 1
+        else:
+            hi = start
+    return lo
+
+
+def _lines_with_prefix(mm: Optional[mmap.mmap], prefix: bytes) -> Iterator[List[str]]:
+    if mm is None:
+        return
+    pos = _first_line_at_or_after(mm, prefix)
+    while pos < len(mm):
+        end = mm.find(b"\n", pos)
+        end = len(mm) if end == -1 else end
+        line = mm[pos:end]
+        if not line.startswith(prefix):
+            return
+        yield line.decode("utf-8").split("\t")
+        pos = end + 1
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot directory."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path).expanduser()
+        self._records = _map(self.path / "records.bin")
+        self._index = _map(self.path / "index.bin")
+        self._labels = _map(self.path / "labels.tsv")
+        self._claims = _map(self.path / "claims.tsv")
+        self._count = len(self._index) // _INDEX_ENTRY.size if self._index else 0
+        meta_path = self.path / "meta.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        languages = meta.get("languages")
+        # Languages whose terms the snapshot holds; ``None`` for all of them.
+        self.languages: Optional[Set[str]] = set(languages) if languages is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def covers(self, language: str) -> bool:
+        return self.languages is None or language in self.languages
+
+    def close(self) -> None:
+        for mm in (self._records, self._index, self._labels, self._claims):
+            if mm is not None:
+                mm.close()
+
+    def get_entity(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        key = _split_id(entity_id)
+        if key is not None and self._index is not None:
+            lo, hi = 0, self._count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                kind, number, offset, length = _INDEX_ENTRY.unpack_from(
+                    self._index, mid * _INDEX_ENTRY.size
+                )
+                if (kind, number) < key:
+                    lo = mid + 1
+                elif (kind, number) > key:
+                    hi = mid
+                else:
+                    self.hits += 1
+                    return json.loads(zlib.decompress(self._records[offset:offset + length]))
+        self.misses += 1
+        return None
+
+    def search(
+        self, text: str, language: str, limit: int, type: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Entities whose label or alias in ``language`` starts with ``text``."""
+        prefix = f"{language}\t{normalize(text)}".encode("utf-8")
+        # Like wbsearchentities, search items unless told otherwise.
+        kind = {"item": "Q", "property": "P"}.get(type or "item")
+        results: Dict[str, Dict[str, str]] = {}
+        for _, _, entity_id, label in _lines_with_prefix(self._labels, prefix):
+            if kind and not entity_id.startswith(kind):
+                continue
+            if entity_id not in results:
+                results[entity_id] = {"id": entity_id, "label": label}
+                if len(results) >= limit:
+                    break
+        return list(results.values())
+
+    def find_by_property(self, property: str, value: str, limit: int) -> List[str]:
+        prefix = f"{property}\t{_clean(value)}\t".encode("utf-8")
+        ids = []
+        for _, _, entity_id in _lines_with_prefix(self._claims, prefix):
+            ids.append(entity_id)
+            if len(ids) >= limit:
+                break
+        return ids
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "entities": self._count,
+            "languages": sorted(self.languages) if self.languages is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@click.command()
+@click.argument("dump", type=click.Path(exists=True, dir_okay=False))
+@click.argument("output", type=click.Path(file_okay=False))
+@click.option(
+    "--ids-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="File listing the entity IDs to keep, one per line",
+)
+@click.option(
+    "--languages",
+    help="Comma-separated language codes to keep for labels, descriptions and aliases",
+)
+def main(
+    dump: str, output: str, ids_file: Optional[str] = None, languages: Optional[str] = None
+) -> None:
+    """Build a local entity snapshot from a Wikidata JSON DUMP into OUTPUT."""
+    logging.basicConfig(level=logging.INFO)
+    ids = None
+    if ids_file:
+        with open(ids_file) as f:
+            ids = {line.strip() for line in f if line.strip()}
+    langs = {lang.strip() for lang in languages.split(",")} if languages else None
+
+    count = build_snapshot(dump, output, ids, langs)
+    logger.info("Wrote %d entities to %s", count, output)
+
+
+if __name__ == "__main__":
+    main()
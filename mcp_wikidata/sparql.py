@@ -0,0 +1,520 @@
+"""Lightweight lexical helpers for SPARQL query text."""
+
+import base64
+import json
+import re
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .sparql_results import PREFIXES
+
+_IRI = re.compile(r"<[^<>\"{}|^`\\\s]*>")
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_INTEGER = re.compile(r"\s+(\d+)")
+
+
+def tokens(query: str) -> Iterator[Tuple[str, int, int, int]]:
+    """Yield ``(kind, start, end, depth)`` for the significant parts of a query.
+
+    ``kind`` is one of ``"word"``, ``"string"``, ``"iri"``, ``"comment"`` or
+    ``"punct"``; ``depth`` is the brace nesting level. Strings, IRIs and
+    comments are returned whole, so keywords or braces inside them are never
+    mistaken for syntax.
+    """
+    depth = 0
+    pos = 0
+    length = len(query)
+    while pos < length:
+        char = query[pos]
+        if char.isspace():
+            pos += 1
+            continue
+        if char == "#":
+            end = query.find("\n", pos)
+            end = length if end == -1 else end
+            yield "comment", pos, end, depth
+            pos = end
+            continue
+        if char in "\"'":
+            quote = query[pos:pos + 3] if query[pos:pos + 3] in ('"""', "'''") else char
+            end = pos + len(quote)
+            while end < length and not query.startswith(quote, end):
+                end += 2 if query[end] == "\\" else 1
+            end = min(length, end + len(quote))
+            yield "string", pos, end, depth
+            pos = end
+            continue
+        if char == "<":
+            match = _IRI.match(query, pos)
+            if match:
+                yield "iri", pos, match.end(), depth
+                pos = match.end()
+                continue
+        match = _WORD.match(query, pos)
+        if match:
+            yield "word", pos, match.end(), depth
+            pos = match.end()
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth = max(0, depth - 1)
+        yield "punct", pos, pos + 1, depth
+        pos += 1
+
+
+def strip_comments(query: str) -> str:
+    parts = []
+    last = 0
+    for kind, start, end, _ in tokens(query):
+        if kind == "comment":
+            parts.append(query[last:start])
+            last = end
+    parts.append(query[last:])
+    return "".join(parts)
+
+
+# Keywords are case-insensitive in SPARQL; these are upper-cased when normalizing.
+_KEYWORDS = {
+    "ASK", "AS", "ASC", "BASE", "BIND", "BY", "CONSTRUCT", "COUNT", "DESC",
+    "DESCRIBE", "DISTINCT", "FILTER", "FROM", "GROUP", "HAVING", "IN", "LIMIT",
+    "MINUS", "NOT", "OFFSET", "OPTIONAL", "ORDER", "PREFIX", "REDUCED",
+    "SELECT", "SERVICE", "UNION", "VALUES", "WHERE",
+}
+# Whitespace next to these characters never changes the meaning of a query.
+_TIGHT = set("{}(),;")
+
+
+def _builtin_prefixes(query: str) -> List[Tuple[int, int]]:
+    """Spans of ``PREFIX p: <iri>`` declarations that WDQS already predefines."""
+    significant = [
+        (kind, query[start:end], start, end)
+        for kind, start, end, _ in tokens(query)
+        if kind != "comment"
+    ]
+    spans = []
+    for i, (kind, text, start, _) in enumerate(significant):
+        if kind != "word" or text.upper() != "PREFIX":
+            continue
+        declaration = significant[i + 1:i + 4]
+        if (
+            len(declaration) == 3
+            and declaration[1][1] == ":"
+            and declaration[2][0] == "iri"
+            and PREFIXES.get(declaration[0][1]) == declaration[2][1][1:-1]
+        ):
+            spans.append((start, declaration[2][3]))
+    return spans
+
+
+def normalize_query(query: str) -> str:
+    """Canonical text of a query, for use as a cache key.
+
+    Comments and the declarations of prefixes WDQS predefines are dropped,
+    keywords upper-cased and whitespace collapsed, leaving strings and IRIs
+    untouched. Two queries with the same normalized text are equivalent.
+    """
+    skipped = _builtin_prefixes(query)
+    parts: List[str] = []
+    previous_end = 0
+    previous_text = ""
+    for kind, start, end, _ in tokens(query):
+        if kind == "comment" or any(a <= start < b for a, b in skipped):
+            continue
+        text = query[start:end]
+        if (
+            kind == "word"
+            and text.upper() in _KEYWORDS
+            and previous_text not in ("?", "$", ":")
+            and not query.startswith(":", end)
+        ):
+            text = text.upper()
+        if parts and start != previous_end and text not in _TIGHT and previous_text not in _TIGHT:
+            parts.append(" ")
+        parts.append(text)
+        previous_end = end
+        previous_text = text
+    return "".join(parts)
+
+
+def _modifier_spans(query: str) -> List[Tuple[str, int, int, int]]:
+    """Top-level ``LIMIT n`` / ``OFFSET n`` clauses as ``(keyword, value, start, end)``."""
+    spans = []
+    for kind, start, end, depth in tokens(query):
+        if kind != "word" or depth != 0:
+            continue
+        keyword = query[start:end].upper()
+        if keyword not in ("LIMIT", "OFFSET"):
+            continue
+        match = _INTEGER.match(query, end)
+        if match:
+            spans.append((keyword, int(match.group(1)), start, match.end()))
+    return spans
+
+
+def get_limit_offset(query: str) -> Tuple[Optional[int], Optional[int]]:
+    """Return the top-level LIMIT and OFFSET of a query, ignoring subqueries."""
+    limit = offset = None
+    for keyword, value, _, _ in _modifier_spans(query):
+        if keyword == "LIMIT":
+            limit = value
+        else:
+            offset = value
+    return limit, offset
+
+
+def set_limit_offset(query: str, limit: Optional[int], offset: Optional[int] = None) -> str:
+    """Replace the top-level LIMIT/OFFSET of a query with the given values."""
+    parts = []
+    last = 0
+    for _, _, start, end in _modifier_spans(query):
+        parts.append(query[last:start])
+        last = end
+    parts.append(query[last:])
+    query = "".join(parts).rstrip()
+    # Newlines keep the modifiers out of a trailing comment.
+    if limit is not None:
+        query += f"\nLIMIT {limit}"
+    if offset:
+        query += f"\nOFFSET {offset}"
+    return query
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack pagination state into an opaque, URL-safe cursor string."""
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(zlib.compress(raw)).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(zlib.decompress(base64.urlsafe_b64decode(padded)))
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Invalid pagination cursor: {e}") from e
+    if not isinstance(state, dict) or not {"q", "o", "n"} <= state.keys():
+        raise ValueError("Invalid pagination cursor")
+    return state
+
+
+# Classes with millions of instances or subclasses: transitive paths anchored
+# on them have to walk a large part of the graph.
+HUGE_CLASSES = {
+    "Q5",          # human
+    "Q13442814",   # scholarly article
+    "Q16521",      # taxon
+    "Q7187",       # gene
+    "Q8054",       # protein
+    "Q11173",      # chemical compound
+    "Q523",        # star
+    "Q486972",     # human settlement
+    "Q4167836",    # Wikimedia category
+    "Q4167410",    # Wikimedia disambiguation page
+    "Q7725634",    # literary work
+    "Q35120",      # entity
+    "Q488383",     # object
+}
+
+_QUERY_FORMS = ("SELECT", "ASK", "CONSTRUCT", "DESCRIBE")
+_AGGREGATES = ("COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "SAMPLE")
+_PATH_PARTS = set("/|^()*+?!")
+_EXPENSIVE_OFFSET = 10000
+
+_COST_LEVELS = ("cheap", "expensive", "prohibitive")
+
+
+class QueryAnalysis:
+    """Static analysis of a SPARQL query ahead of sending it to WDQS.
+
+    ``cost`` is ``"cheap"``, ``"expensive"`` or ``"prohibitive"``, the worst
+    level among ``issues``, each a ``(level, message)`` pair.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.form: Optional[str] = None
+        self.limit, self.offset = get_limit_offset(query)
+        self.issues: List[Tuple[str, str]] = []
+        self._analyze(query)
+
+    @property
+    def cost(self) -> str:
+        return max(
+            (level for level, _ in self.issues), key=_COST_LEVELS.index, default="cheap"
+        )
+
+    def reasons(self, level: str) -> List[str]:
+        return [message for issue_level, message in self.issues if issue_level == level]
+
+    def _flag(self, level: str, message: str) -> None:
+        if (level, message) not in self.issues:
+            self.issues.append((level, message))
+
+    def _analyze(self, query: str) -> None:
+        terms = _terms(query)
+        aggregated = False
+        for kind, text, depth in terms:
+            if kind != "word" or depth != 0:
+                continue
+            keyword = text.upper()
+            if self.form is None and keyword in _QUERY_FORMS:
+                self.form = keyword
+            # These need every solution before the first row can be returned;
+            # DISTINCT only when there is no LIMIT to stop at.
+            if keyword in ("GROUP", "ORDER") or keyword in _AGGREGATES:
+                aggregated = True
+            elif keyword == "DISTINCT" and self.limit is None:
+                aggregated = True
+
+        bound_vars = _bound_variables(terms)
+
+        # Constants outside SERVICE blocks are what binds triple patterns.
+        bound = any(
+            kind in ("pname", "iri", "literal") and depth > 0 and not service
+            for kind, _, depth, service in _with_service(terms)
+        )
+
+        for i, (kind, text, depth) in enumerate(terms):
+            if depth == 0:
+                continue
+            previous = terms[i - 1][1] if i else ""
+            if (
+                kind == "var"
+                and self.form != "ASK"
+                and previous in ("{", ".", "}")
+                and [term[0] for term in terms[i:i + 3]] == ["var", "var", "var"]
+                and text not in bound_vars
+                and terms[i + 2][1] not in bound_vars
+            ):
+                # Streaming the first rows of a scan is fast; sorting or
+                # aggregating every statement of Wikidata is not.
+                pattern = " ".join(term[1] for term in terms[i:i + 3])
+                if not bound and aggregated:
+                    self._flag(
+                        "prohibitive",
+                        f"triple pattern {pattern} with no bound term, sorted or "
+                        "aggregated over every statement",
+                    )
+                else:
+                    self._flag("expensive", f"unbound triple pattern {pattern}")
+
+            if kind == "punct" and text in ("*", "+") and previous and (
+                terms[i - 1][0] == "pname" or previous == ")"
+            ):
+                self._check_closure(terms, i, aggregated, bound_vars)
+
+            if (
+                kind == "pname"
+                and text in ("wdt:P31", "wdt:P279")
+                and i + 1 < len(terms)
+                and _local(terms[i + 1]) in HUGE_CLASSES
+                and aggregated
+            ):
+                self._flag(
+                    "expensive",
+                    f"sorting or aggregating every instance of {terms[i + 1][1]}",
+                )
+
+        if self.offset is not None and self.offset > _EXPENSIVE_OFFSET:
+            self._flag("expensive", f"OFFSET {self.offset} computes every skipped row")
+
+    def _check_closure(
+        self,
+        terms: List[Tuple[str, str, int]],
+        index: int,
+        aggregated: bool,
+        bound_vars: Set[str],
+    ) -> None:
+        start = index
+        while start > 0 and (terms[start - 1][0] == "pname" or terms[start - 1][1] in _PATH_PARTS):
+            start -= 1
+        end = index
+        while end + 1 < len(terms) and terms[end + 1][0] == "punct" and terms[end + 1][1] in _PATH_PARTS:
+            end += 1
+        path = "".join(term[1] for term in terms[start:end + 1])
+        subject = terms[start - 1] if start > 0 else None
+        obj = terms[end + 1] if end + 1 < len(terms) else None
+        if subject is None or obj is None:
+            return
+
+        if (
+            subject[0] == "var"
+            and obj[0] == "var"
+            and subject[1] not in bound_vars
+            and obj[1] not in bound_vars
+        ):
+            self._flag(
+                "prohibitive",
+                f"transitive path {subject[1]} {path} {obj[1]} between two unbound variables",
+            )
+        elif _local(obj) in HUGE_CLASSES or _local(subject) in HUGE_CLASSES:
+            anchor = obj if _local(obj) in HUGE_CLASSES else subject
+            level = "prohibitive" if aggregated else "expensive"
+            detail = "aggregated or sorted " if aggregated else ""
+            self._flag(level, f"{detail}transitive path {path} over {anchor[1]}, a huge class")
+
+
+def _local(term: Optional[Tuple[str, str, int]]) -> str:
+    if term is None or term[0] not in ("pname", "iri"):
+        return ""
+    return re.split(r"[:/#]", term[1].strip("<>"))[-1]
+
+
+def _terms(query: str) -> List[Tuple[str, str, int]]:
+    """Group tokens into RDF terms: variables, prefixed names, IRIs and literals.
+
+    Returns ``(kind, text, depth)`` triples where ``kind`` is ``"var"``,
+    ``"pname"``, ``"iri"``, ``"literal"``, ``"word"`` or ``"punct"``.
+    """
+    raw = [
+        (kind, query[start:end], start, end, depth)
+        for kind, start, end, depth in tokens(query)
+        if kind != "comment"
+    ]
+
+    def joined(j: int, kind: str, text: Optional[str] = None) -> bool:
+        """Whether token ``j`` directly follows token ``j - 1`` and matches."""
+        return (
+            j < len(raw)
+            and raw[j][2] == raw[j - 1][3]
+            and raw[j][0] == kind
+            and (text is None or raw[j][1] == text)
+        )
+
+    terms: List[Tuple[str, str, int]] = []
+    i = 0
+    while i < len(raw):
+        kind, text, _, _, depth = raw[i]
+        length = 1
+        if kind == "punct" and text in ("?", "$") and joined(i + 1, "word"):
+            kind, length = "var", 2
+        elif kind == "word" and joined(i + 1, "punct", ":"):
+            kind, length = "pname", 3 if joined(i + 2, "word") else 2
+        elif kind == "punct" and text == ":" and joined(i + 1, "word"):
+            kind, length = "pname", 2
+        elif kind == "string":
+            kind = "literal"
+            # A language tag belongs to the literal.
+            if joined(i + 1, "punct", "@") and joined(i + 2, "word"):
+                length = 3
+        terms.append((kind, "".join(part[1] for part in raw[i:i + length]), depth))
+        i += length
+    return terms
+
+
+def _with_service(
+    terms: List[Tuple[str, str, int]]
+) -> Iterator[Tuple[str, str, int, bool]]:
+    """Yield terms flagged with whether they sit inside a SERVICE block."""
+    service_depth: Optional[int] = None
+    pending = False
+    for kind, text, depth in terms:
+        if kind == "word" and text.upper() == "SERVICE":
+            pending = True
+        elif pending and text == "{":
+            service_depth = depth
+            pending = False
+        elif service_depth is not None and text == "}" and depth < service_depth:
+            service_depth = None
+        yield kind, text, depth, service_depth is not None
+
+
+def _triple_patterns(
+    terms: List[Tuple[str, str, int]]
+) -> Tuple[List[Tuple[Tuple[str, str], Tuple[str, str]]], Set[str]]:
+    """Subject/object pairs of the triple patterns, and the variables of VALUES.
+
+    A rough parse of the WHERE clause: statements are split on ``.``,
+    ``;``, ``,`` and braces, FILTER/BIND expressions and SERVICE blocks are
+    skipped, and a predicate path runs as long as path operators join its
+    parts.
+    """
+    items = [
+        (kind, text, depth)
+        for kind, text, depth, service in _with_service(terms)
+        if depth > 0 and not service
+    ]
+    pairs: List[Tuple[Tuple[str, str], Tuple[str, str]]] = []
+    values: Set[str] = set()
+
+    def flush(statement: List[Tuple[str, str]]) -> None:
+        j = 1
+        while j < len(statement):
+            path = [statement[j]]
+            j += 1
+            while j < len(statement) and (
+                (path[-1][0] == "punct" and path[-1][1] in "/|^(!")
+                or statement[j][1] in ("/", "|", ")", "*", "+", "?")
+            ):
+                path.append(statement[j])
+                j += 1
+            while j < len(statement):
+                pairs.append((statement[0], statement[j]))
+                j += 1
+                if j < len(statement) and statement[j][1] == ",":
+                    j += 1
+                    continue
+                break
+            if j < len(statement) and statement[j][1] == ";":
+                j += 1
+                continue
+            break
+
+    def skip_group(i: int, opening: str, closing: str) -> int:
+        level = 0
+        while i < len(items):
+            if items[i][1] == opening:
+                level += 1
+            elif items[i][1] == closing:
+                level -= 1
+                if level <= 0:
+                    return i + 1
+            i += 1
+        return i
+
+    statement: List[Tuple[str, str]] = []
+    i = 0
+    while i < len(items):
+        kind, text, _ = items[i]
+        if text in ("{", "}", "."):
+            flush(statement)
+            statement = []
+            i += 1
+        elif kind == "word" and text != "a" and text not in ("true", "false"):
+            flush(statement)
+            statement = []
+            i += 1
+            if text.upper() == "VALUES":
+                while i < len(items) and items[i][1] != "{":
+                    if items[i][0] == "var":
+                        values.add(items[i][1])
+                    i += 1
+                i = skip_group(i, "{", "}")
+            elif i < len(items) and items[i][1] == "(":
+                i = skip_group(i, "(", ")")
+        else:
+            statement.append((kind, text))
+            i += 1
+    flush(statement)
+    return pairs, values
+
+
+def _bound_variables(terms: List[Tuple[str, str, int]]) -> Set[str]:
+    """Variables tied to a constant through triple patterns or listed in VALUES."""
+    pairs, bound = _triple_patterns(terms)
+    changed = True
+    while changed:
+        changed = False
+        for subject, obj in pairs:
+            for known, other in ((subject, obj), (obj, subject)):
+                if (
+                    other[0] == "var"
+                    and other[1] not in bound
+                    and (known[0] != "var" or known[1] in bound)
+                ):
+                    bound.add(other[1])
+                    changed = True
+    return bound
+
+
+def analyze_query(query: str) -> QueryAnalysis:
+    return QueryAnalysis(query)
@@ -0,0 +1,256 @@
+"""Incremental parsing of ``application/sparql-results+json`` responses."""
+
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+_decoder = json.JSONDecoder()
+_KEY = re.compile(r'"(vars|bindings|boolean)"\s*:\s*')
+_SEPARATOR = re.compile(r"[\s,]*")
+
+
+class BindingsParser:
+    """Push parser yielding SPARQL result rows as soon as they are complete.
+
+    Only the row being decoded is buffered, so memory stays flat no matter how
+    large the response is. ``vars`` and ``boolean`` are filled in as they are
+    encountered.
+    """
+
+    def __init__(self) -> None:
+        self.vars: List[str] = []
+        self.boolean: Optional[bool] = None
+        self._buffer = ""
+        self._in_bindings = False
+        self._done = False
+
+    def feed(self, text: str) -> Iterator[Dict[str, Any]]:
+        self._buffer += text
+        pos = 0
+        buffer = self._buffer
+
+        while not self._done:
+            if not self._in_bindings:
+                match = _KEY.search(buffer, pos)
+                if match is None:
+                    # Keep a tail long enough to hold a key split across chunks.
+                    pos = max(pos, len(buffer) - 16)
+                    break
+                key = match.group(1)
+                if key == "bindings":
+                    start = match.end()
+                    if start >= len(buffer):
+                        pos = match.start()
+                        break
+                    if buffer[start] != "[":
+                        raise ValueError("Malformed SPARQL JSON results: expected bindings array")
+                    self._in_bindings = True
+                    pos = start + 1
+                    continue
+                try:
+                    value, end = _decoder.raw_decode(buffer, match.end())
+                except json.JSONDecodeError:
+                    pos = match.start()
+                    break
+                if key == "vars":
+                    self.vars = value
+                else:
+                    self.boolean = value
+                pos = end
+                continue
+
+            pos = _SEPARATOR.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._done = True
+                pos += 1
+                break
+            try:
+                row, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            pos = end
+            yield row
+
+        self._buffer = buffer[pos:]
+
+    def close(self) -> None:
+        if self._in_bindings and not self._done:
+            raise ValueError("Malformed or truncated SPARQL JSON results")
+
+
+class SparqlResultStream:
+    """Rows of a streamed SPARQL JSON response, within row and byte budgets.
+
+    Iterating stops early, and ``truncated`` is set, as soon as more than
+    ``max_rows`` rows or ``max_bytes`` bytes of body have been seen; the rest
+    of the response is never read.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self._chunks = chunks
+        self._parser = BindingsParser()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.truncated = False
+
+    @property
+    def vars(self) -> List[str]:
+        return self._parser.vars
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        count = 0
+        async for chunk in self._chunks:
+            self.received += len(chunk)
+            for row in self._parser.feed(decoder.decode(chunk)):
+                if self.max_rows is not None and count >= self.max_rows:
+                    self.truncated = True
+                    return
+                count += 1
+                yield row
+            if self.max_bytes is not None and self.received > self.max_bytes:
+                self.truncated = True
+                return
+        for row in self._parser.feed(decoder.decode(b"", final=True)):
+            if self.max_rows is not None and count >= self.max_rows:
+                self.truncated = True
+                return
+            count += 1
+            yield row
+        self._parser.close()
+
+    async def collect(self) -> Dict[str, Any]:
+        rows = [row async for row in self]
+        result: Dict[str, Any] = {"head": {"vars": self.vars}}
+        if self._parser.boolean is not None:
+            result["boolean"] = self._parser.boolean
+        else:
+            result["results"] = {"bindings": rows}
+        if self.truncated:
+            result["truncated"] = True
+        return result
+
+
+PREFIXES = {
+    "wd": "http://www.wikidata.org/entity/",
+    "wds": "http://www.wikidata.org/entity/statement/",
+    "wdv": "http://www.wikidata.org/value/",
+    "wdref": "http://www.wikidata.org/reference/",
+    "wdt": "http://www.wikidata.org/prop/direct/",
+    "wdtn": "http://www.wikidata.org/prop/direct-normalized/",
+    "p": "http://www.wikidata.org/prop/",
+    "ps": "http://www.wikidata.org/prop/statement/",
+    "psv": "http://www.wikidata.org/prop/statement/value/",
+    "pq": "http://www.wikidata.org/prop/qualifier/",
+    "pqv": "http://www.wikidata.org/prop/qualifier/value/",
+    "pr": "http://www.wikidata.org/prop/reference/",
+    "prv": "http://www.wikidata.org/prop/reference/value/",
+    "wikibase": "http://wikiba.se/ontology#",
+    "schema": "http://schema.org/",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+}
+_NAMESPACES = {namespace: prefix for prefix, namespace in PREFIXES.items()}
+
+_XSD = PREFIXES["xsd"]
+# xsd:decimal is arbitrary precision, so it keeps its lexical form.
+_NUMERIC_TYPES = {
+    _XSD + "integer": int,
+    _XSD + "int": int,
+    _XSD + "long": int,
+    _XSD + "double": float,
+    _XSD + "float": float,
+}
+
+
+def _split_iri(iri: str) -> Tuple[str, str]:
+    cut = max(iri.rfind("/"), iri.rfind("#")) + 1
+    return iri[:cut], iri[cut:]
+
+
+def shorten_iri(iri: str) -> str:
+    """Compress an IRI with a well-known Wikidata prefix (``wd:Q42``)."""
+    namespace, local = _split_iri(iri)
+    prefix = _NAMESPACES.get(namespace)
+    return f"{prefix}:{local}" if prefix else iri
+
+
+def local_name(iri: str) -> str:
+    """Last path segment of an IRI (``Q42`` for a Wikidata entity)."""
+    return _split_iri(iri)[1] or iri
+
+
+def _cell(
+    term: Optional[Dict[str, Any]], shorten: Callable[[str], str], typed: bool
+) -> Any:
+    if term is None:
+        return None
+    value = term.get("value")
+    if term.get("type") == "uri":
+        return shorten(value)
+    if not typed:
+        return value
+    convert = _NUMERIC_TYPES.get(term.get("datatype", ""))
+    if convert is not None:
+        try:
+            return convert(value)
+        except ValueError:
+            return value
+    return value
+
+
+def to_rows(
+    result: Dict[str, Any],
+    shorten: Callable[[str], str] = shorten_iri,
+    typed: bool = True,
+) -> Tuple[List[str], List[List[Any]]]:
+    """Flatten SPARQL JSON bindings into a header and rows of plain values.
+
+    All cells are converted in a single pass over the bindings: IRIs are
+    shortened, integer and floating-point literals become numbers unless
+    ``typed`` is false, other literals keep their lexical value, and unbound
+    variables are ``None``.
+    """
+    variables = result.get("head", {}).get("vars", [])
+    bindings = result.get("results", {}).get("bindings", [])
+    rows = [
+        [_cell(row.get(var), shorten, typed) for var in variables] for row in bindings
+    ]
+    return variables, rows
+
+
+def compact_results(result: Dict[str, Any], columnar: bool = False) -> Dict[str, Any]:
+    """Convert SPARQL JSON results to a compact row- or column-oriented layout."""
+    variables, rows = to_rows(result)
+
+    used = set()
+    for row in rows:
+        for cell in row:
+            if isinstance(cell, str):
+                prefix, sep, _ = cell.partition(":")
+                if sep and prefix in PREFIXES:
+                    used.add(prefix)
+
+    compact: Dict[str, Any] = {"vars": variables}
+    if columnar:
+        columns = list(zip(*rows)) if rows else [() for _ in variables]
+        compact["columns"] = {var: list(column) for var, column in zip(variables, columns)}
+    else:
+        compact["rows"] = rows
+    compact["prefixes"] = {prefix: PREFIXES[prefix] for prefix in sorted(used)}
+    for key in ("boolean", "truncated", "page"):
+        if key in result:
+            compact[key] = result[key]
+    return compact
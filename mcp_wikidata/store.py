@@ -0,0 +1,153 @@
+"""Persistent SQLite-backed store for Wikibase API responses."""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    revision INTEGER,
+    fetched_at REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (id, language)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(
+        json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    )
+
+
+def _decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+class EntityStore:
+    """Disk cache for ``wbgetentities`` and ``wbsearchentities`` responses.
+
+    Entities are stored one row per (entity ID, language) together with their
+    revision, as zlib-compressed JSON. The database runs in WAL mode so that
+    several server processes on the same host can read it concurrently.
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        Path(path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(Path(path).expanduser()), check_same_thread=False, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl
+
+    def _get_entities(
+        self, ids: List[str], language: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        placeholders = ",".join("?" for _ in ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, fetched_at, data FROM entities WHERE language = ? "
+                f"AND id IN ({placeholders})",
+                [language, *ids],
+            ).fetchall()
+        fresh_after = self._fresh_after()
+        fresh: Dict[str, Any] = {}
+        stale: Dict[str, Any] = {}
+        for entity_id, fetched_at, data in rows:
+            (fresh if fetched_at >= fresh_after else stale)[entity_id] = _decode(data)
+        return fresh, stale
+
+    def _put_entities(self, entities: Dict[str, Any], language: str) -> None:
+        now = time.time()
+        rows = [
+            (entity_id, language, entity.get("lastrevid"), now, _encode(entity))
+            for entity_id, entity in entities.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entities "
+                "(id, language, revision, fetched_at, data) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _touch_entities(self, ids: List[str], language: str) -> None:
+        placeholders = ",".join("?" for _ in ids)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE entities SET fetched_at = ? WHERE language = ? "
+                f"AND id IN ({placeholders})",
+                [time.time(), language, *ids],
+            )
+
+    def _get_search(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM searches WHERE key = ? AND fetched_at >= ?",
+                (key, self._fresh_after()),
+            ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def _put_search(self, key: str, value: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, fetched_at, data) "
+                "VALUES (?, ?, ?)",
+                (key, time.time(), _encode(value)),
+            )
+
+    async def get_entities(
+        self, ids: List[str], language: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return fresh and expired rows for ``ids``; expired ones may be revalidated."""
+        fresh, stale = await asyncio.to_thread(self._get_entities, ids, language)
+        self.hits += len(fresh)
+        self.misses += len(ids) - len(fresh)
+        return fresh, stale
+
+    async def touch_entities(self, ids: List[str], language: str) -> None:
+        """Mark rows as fresh again after their revision was found unchanged."""
+        if ids:
+            await asyncio.to_thread(self._touch_entities, ids, language)
+
+    async def put_entities(self, entities: Dict[str, Any], language: str) -> None:
+        if entities:
+            await asyncio.to_thread(self._put_entities, entities, language)
+
+    async def get_search(self, key: str) -> Optional[Any]:
+        found = await asyncio.to_thread(self._get_search, key)
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    async def put_search(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self._put_search, key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses}
@@ -1,17 +1,56 @@
 """MCP tools implementation for Wikidata operations."""
 
-from typing import Any, Dict, List
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
 
 from mcp.types import Tool, TextContent
 
 from .config import Config
+from .retry import deadline_scope
+from .scheduler import Lane, Scheduler
+from .serialization import dumps
 from .wikidata_client import WikidataClient
 
+logger = logging.getLogger(__name__)
+
+# Accepted by every tool: the call, upstream requests included, is cancelled
+# once this many milliseconds have elapsed.
+TIMEOUT_MS = {
+    "type": "integer",
+    "description": "Deadline for the whole call in milliseconds; upstream requests are cancelled when it expires",
+    "minimum": 1
+}
+
+# Scheduler lane of each tool, so that quick lookups never wait behind
+# SPARQL queries that can take up to a minute. server_stats bypasses the
+# scheduler so that it still answers when every lane is saturated.
+TOOL_LANES: Dict[str, Optional[str]] = {
+    "server_stats": None,
+    "search_entities": "search",
+    "get_entity": "lookup",
+    "get_entities": "lookup",
+    "sparql_query": "sparql",
+    "get_relations": "sparql",
+    "traverse": "sparql",
+    "find_by_property": "sparql",
+}
+
 
 class WikidataTools:
     def __init__(self, config: Config) -> None:
         self.config = config
         self.client = WikidataClient(config)
+        self.scheduler = Scheduler(
+            config.max_concurrent_calls,
+            [
+                Lane("search", 0, config.search_concurrency, config.call_queue_size),
+                Lane("lookup", 1, config.lookup_concurrency, config.call_queue_size),
+                Lane("sparql", 2, config.sparql_concurrency, config.call_queue_size),
+            ],
+        )
+        self.cancelled = 0
+        self.deadline_exceeded = 0
 
     def get_tool_definitions(self) -> List[Tool]:
         return [
@@ -26,8 +65,11 @@ class WikidataTools:
                             "description": "Search term"
                         },
                         "language": {
-                            "type": "string", 
-                            "description": "Language code (default: en)",
+                            "anyOf": [
+                                {"type": "string"},
+                                {"type": "array", "items": {"type": "string"}, "minItems": 1}
+                            ],
+                            "description": "Language code, or list of codes in fallback order (fr-ca, fr, en); with several, results carry labels and descriptions in each (default: en)",
                             "default": "en"
                         },
                         "limit": {
@@ -40,7 +82,8 @@ class WikidataTools:
                             "type": "string",
                             "description": "Entity type filter (item, property)",
                             "enum": ["item", "property"]
-                        }
+                        },
+                        "timeout_ms": TIMEOUT_MS
                     },
                     "required": ["query"]
                 }
@@ -56,10 +99,18 @@ class WikidataTools:
                             "description": "Wikidata entity ID (Q123, P456)"
                         },
                         "language": {
-                            "type": "string",
-                            "description": "Language code (default: en)",
+                            "anyOf": [
+                                {"type": "string"},
+                                {"type": "array", "items": {"type": "string"}, "minItems": 1}
+                            ],
+                            "description": "Language code, or list of codes fetched together in fallback order (fr-ca, fr, en) (default: en)",
                             "default": "en"
                         },
+                        "language_fallback": {
+                            "type": "boolean",
+                            "description": "Fill missing labels and descriptions from Wikibase language fallback chains (default: false)",
+                            "default": False
+                        },
                         "properties": {
                             "type": "array",
                             "items": {"type": "string"},
@@ -69,14 +120,104 @@ class WikidataTools:
                             "type": "boolean",
                             "description": "Return simplified format (default: false)",
                             "default": False
-                        }
+                        },
+                        "claims": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Only include statements for these property IDs (P31, P569)"
+                        },
+                        "max_statements": {
+                            "type": "integer",
+                            "description": "Maximum number of statements per property",
+                            "minimum": 0
+                        },
+                        "include_references": {
+                            "type": "boolean",
+                            "description": "Include statement references (default: true)",
+                            "default": True
+                        },
+                        "include_qualifiers": {
+                            "type": "boolean",
+                            "description": "Include statement qualifiers (default: true)",
+                            "default": True
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": "Maximum serialized size of the entity in bytes; statements beyond it are truncated",
+                            "minimum": 1
+                        },
+                        "timeout_ms": TIMEOUT_MS
                     },
                     "required": ["entity_id"]
                 }
             ),
+            Tool(
+                name="get_entities",
+                description="Get several Wikidata entities at once (batched, up to 50 IDs per upstream request)",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "entity_ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Wikidata entity IDs (Q123, P456)"
+                        },
+                        "language": {
+                            "anyOf": [
+                                {"type": "string"},
+                                {"type": "array", "items": {"type": "string"}, "minItems": 1}
+                            ],
+                            "description": "Language code, or list of codes fetched together in fallback order (fr-ca, fr, en) (default: en)",
+                            "default": "en"
+                        },
+                        "language_fallback": {
+                            "type": "boolean",
+                            "description": "Fill missing labels and descriptions from Wikibase language fallback chains (default: false)",
+                            "default": False
+                        },
+                        "properties": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Specific properties to include"
+                        },
+                        "simplified": {
+                            "type": "boolean",
+                            "description": "Return simplified format (default: false)",
+                            "default": False
+                        },
+                        "claims": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Only include statements for these property IDs (P31, P569)"
+                        },
+                        "max_statements": {
+                            "type": "integer",
+                            "description": "Maximum number of statements per property",
+                            "minimum": 0
+                        },
+                        "include_references": {
+                            "type": "boolean",
+                            "description": "Include statement references (default: true)",
+                            "default": True
+                        },
+                        "include_qualifiers": {
+                            "type": "boolean",
+                            "description": "Include statement qualifiers (default: true)",
+                            "default": True
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": "Maximum serialized size of each entity in bytes; statements beyond it are truncated",
+                            "minimum": 1
+                        },
+                        "timeout_ms": TIMEOUT_MS
+                    },
+                    "required": ["entity_ids"]
+                }
+            ),
             Tool(
                 name="sparql_query",
-                description="Execute a SPARQL query against Wikidata",
+                description="Execute a SPARQL query against Wikidata, optionally paginated with page_size/cursor. Queries estimated as unable to finish on WDQS (sorting or aggregating an unbound ?s ?p ?o, transitive paths between two unbound variables or aggregated over huge classes) are reported, or rejected with an explanation when the guard is enforced",
                 inputSchema={
                     "type": "object",
                     "properties": {
@@ -86,8 +227,8 @@ class WikidataTools:
                         },
                         "format": {
                             "type": "string",
-                            "description": "Response format",
-                            "enum": ["json", "csv", "xml"],
+                            "description": "Response format: json bindings, compact (header + rows, prefixed IRIs), columnar (one array per variable), csv or xml",
+                            "enum": ["json", "compact", "columnar", "csv", "xml"],
                             "default": "json"
                         },
                         "limit": {
@@ -95,9 +236,22 @@ class WikidataTools:
                             "description": "Maximum number of results (default: 100, max: 1000)",
                             "default": 100,
                             "maximum": 1000
-                        }
+                        },
+                        "page_size": {
+                            "type": "integer",
+                            "description": "Enable pagination and return pages of this many rows (json format only); the query's own LIMIT/OFFSET bound the paginated range",
+                            "minimum": 1
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Opaque cursor from a previous page's page.next_cursor; replaces query"
+                        },
+                        "timeout_ms": TIMEOUT_MS
                     },
-                    "required": ["query"]
+                    "anyOf": [
+                        {"required": ["query"]},
+                        {"required": ["cursor"]}
+                    ]
                 }
             ),
             Tool(
@@ -126,11 +280,63 @@ class WikidataTools:
                             "description": "Maximum number of relations",
                             "default": 20,
                             "maximum": 100
-                        }
+                        },
+                        "timeout_ms": TIMEOUT_MS
                     },
                     "required": ["entity_id"]
                 }
             ),
+            Tool(
+                name="traverse",
+                description="Explore the Wikidata graph breadth-first from seed items, following chosen properties, and return the subgraph",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "seeds": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Item IDs to start from (Q42)"
+                        },
+                        "properties": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Property IDs to follow (default: all direct claims)"
+                        },
+                        "depth": {
+                            "type": "integer",
+                            "description": "Number of hops (default: 1, max: 3)",
+                            "default": 1,
+                            "minimum": 1,
+                            "maximum": 3
+                        },
+                        "direction": {
+                            "type": "string",
+                            "description": "Edge direction to follow",
+                            "enum": ["outgoing", "incoming", "both"],
+                            "default": "outgoing"
+                        },
+                        "max_nodes": {
+                            "type": "integer",
+                            "description": "Maximum number of nodes (default: 100)",
+                            "default": 100,
+                            "maximum": 1000
+                        },
+                        "max_edges": {
+                            "type": "integer",
+                            "description": "Maximum number of edges (default: 500)",
+                            "default": 500,
+                            "maximum": 5000
+                        },
+                        "language": {
+                            "type": "string",
+                            "description": "Language code for node labels (default: en)",
+                            "default": "en"
+                        },
+                        "timeout_ms": TIMEOUT_MS
+                    },
+                    "required": ["seeds"]
+                }
+            ),
             Tool(
                 name="find_by_property",
                 description="Find entities by property and value",
@@ -155,32 +361,56 @@ class WikidataTools:
                             "description": "Maximum number of results",
                             "default": 10,
                             "maximum": 100
-                        }
+                        },
+                        "timeout_ms": TIMEOUT_MS
                     },
                     "required": ["property", "value"]
                 }
+            ),
+            Tool(
+                name="server_stats",
+                description="Report server metrics: cache hit rates, request coalescing, rate-limit waits, retries, SPARQL guard decisions, cancellations and scheduler queue depths",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
             )
         ]
 
     async def call_tool(self, name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+        arguments = dict(arguments)
+        timeout_ms: Optional[int] = arguments.pop("timeout_ms", None)
+        timeout = timeout_ms / 1000 if timeout_ms else None
         try:
-            if name == "search_entities":
-                result = await self.client.search_entities(**arguments)
-            elif name == "get_entity":
-                result = await self.client.get_entity(**arguments)
-            elif name == "sparql_query":
-                result = await self.client.sparql_query(**arguments)
-            elif name == "get_relations":
-                result = await self.client.get_relations(**arguments)
-            elif name == "find_by_property":
-                result = await self.client.find_by_property(**arguments)
-            else:
-                raise ValueError(f"Unknown tool: {name}")
+            with deadline_scope(self.config.retry_deadline), deadline_scope(timeout):
+                # Cancelling the call, on MCP cancellation or at the deadline,
+                # cancels the HTTP request it is waiting on. Time spent queued
+                # counts against the deadline.
+                lane = TOOL_LANES.get(name, "lookup")
+                if lane is None:
+                    call = self._dispatch(name, arguments)
+                else:
+                    call = self.scheduler.run(lane, lambda: self._dispatch(name, arguments))
+                result = await asyncio.wait_for(call, timeout)
 
             return [
                 TextContent(
                     type="text",
-                    text=str(result)
+                    text=dumps(result, compact=self.config.compact_json)
+                )
+            ]
+
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            logger.debug("Call to %s cancelled by the client", name)
+            raise
+
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            return [
+                TextContent(
+                    type="text",
+                    text=f"Error executing {name}: deadline of {timeout_ms} ms exceeded"
                 )
             ]
 
@@ -194,4 +424,34 @@ class WikidataTools:
                     type="text",
                     text=f"Error executing {name}: {error_msg}"
                 )
-            ]
\ No newline at end of file
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.client.get_stats(),
+            "calls": {
+                "cancelled": self.cancelled,
+                "deadline_exceeded": self.deadline_exceeded,
+            },
+            "scheduler": self.scheduler.stats(),
+        }
+
+    async def _dispatch(self, name: str, arguments: Dict[str, Any]) -> Any:
+        if name == "search_entities":
+            return await self.client.search_entities(**arguments)
+        elif name == "get_entity":
+            return await self.client.get_entity(**arguments)
+        elif name == "get_entities":
+            return await self.client.get_entities(**arguments)
+        elif name == "sparql_query":
+            return await self.client.sparql_query(**arguments)
+        elif name == "get_relations":
+            return await self.client.get_relations(**arguments)
+        elif name == "traverse":
+            return await self.client.traverse(**arguments)
+        elif name == "find_by_property":
+            return await self.client.find_by_property(**arguments)
+        elif name == "server_stats":
+            return self.get_stats()
+        else:
+            raise ValueError(f"Unknown tool: {name}")
@@ -2,58 +2,610 @@
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import logging
+import re
+from typing import Any, Awaitable, Dict, List, Optional, Set, Tuple, Union
 from urllib.parse import quote
 
 import httpx
 
+from .cache import ResponseCache, SparqlCache, make_key
+from .coalesce import SingleFlight
 from .config import Config
+from .prefix_index import PrefixIndex
+from .projection import filter_entity, merge_terms, project_entity, truncate_to_budget
+from .rate_limit import TokenBucket
+from .retry import SPARQL_RETRYABLE_ERRORS, SPARQL_RETRYABLE_STATUS_CODES, RetryPolicy
+from .serialization import dumps
+from .snapshot import Snapshot
+from .sparql import (
+    analyze_query,
+    decode_cursor,
+    encode_cursor,
+    get_limit_offset,
+    normalize_query,
+    set_limit_offset,
+)
+from .sparql_results import SparqlResultStream, compact_results, local_name, to_rows
+from .store import EntityStore
+
+logger = logging.getLogger(__name__)
+
+WBGETENTITIES_MAX_IDS = 50
+
+PROPERTY_ID = re.compile(r"^P[1-9][0-9]*$")
+ITEM_ID = re.compile(r"^Q[1-9][0-9]*$")
+
+# Frontier nodes bound per traversal query through VALUES.
+TRAVERSE_BATCH_SIZE = 50
+
+# Server-side time limit of query.wikidata.org, in seconds.
+WDQS_QUERY_TIMEOUT = 60
+
+# Result layouts computed locally from SPARQL JSON results.
+COMPACT_FORMATS = ("compact", "columnar")
+
+TERM_PROPS = ("labels", "descriptions", "aliases")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _property_ids(properties: List[str]) -> List[str]:
+    ids = []
+    for prop in properties:
+        prop_id = prop.strip().rpartition(":")[2].upper()
+        if not PROPERTY_ID.match(prop_id):
+            raise ValueError(f"Invalid property ID: {prop}")
+        ids.append(prop_id)
+    return ids
+
+
+def _is_count(value: Any, minimum: int) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+def _chunked(ids: List[str]) -> List[List[str]]:
+    return [ids[i:i + WBGETENTITIES_MAX_IDS] for i in range(0, len(ids), WBGETENTITIES_MAX_IDS)]
+
+
+def _page_title(entity_id: str) -> str:
+    """Wiki page title of an entity: items live in the main namespace."""
+    namespace = {"P": "Property:", "L": "Lexeme:"}.get(entity_id[:1], "")
+    return namespace + entity_id
+
+
+def _language_list(language: Union[str, List[str]]) -> List[str]:
+    """Language codes in fallback order, from a code, a pipe-separated string or a list."""
+    codes = language.split("|") if isinstance(language, str) else language
+    languages = list(dict.fromkeys(code.strip() for code in codes if code.strip()))
+    if not languages:
+        raise ValueError("At least one language code is required")
+    return languages
+
+
+def _entity_params(languages: List[str], fallback: bool) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "action": "wbgetentities",
+        "languages": "|".join(languages),
+        "format": "json",
+    }
+    if fallback:
+        params["languagefallback"] = 1
+    return params
+
+
+def _first_term(section: Dict[str, Any], languages: List[str]) -> Optional[str]:
+    for language in languages:
+        if language in section:
+            return section[language]["value"]
+    return None
+
+
+def _covers(
+    entry: Dict[str, Any], requested: Optional[Set[str]], fallback: bool
+) -> bool:
+    if entry["languages"] is None:
+        return True
+    if requested is None:
+        return False
+    return requested <= (entry["fallback"] if fallback else entry["languages"])
+
+
+def _entity_entry(
+    entity: Dict[str, Any],
+    covered: Optional[Set[str]],
+    fallback: bool,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Cache entry for an entity whose terms cover ``covered`` (``None``: all languages).
+
+    A ``previous`` entry for the same entity is extended with the new terms.
+    ``fallback`` lists the languages fetched with ``languagefallback``.
+    """
+    languages = set(covered) if covered is not None else None
+    with_fallback = set(covered) if fallback and covered is not None else set()
+    revision = entity.get("lastrevid")
+    if previous is not None:
+        # Keep the older revision, so that a change made in between is
+        # caught by the next revalidation.
+        entity = merge_terms(previous["entity"], entity)
+        revision = previous["revision"]
+        if languages is not None:
+            languages |= previous["languages"]
+        with_fallback |= previous["fallback"]
+    return {
+        "entity": entity,
+        "languages": languages,
+        "fallback": with_fallback,
+        "revision": revision,
+    }
 
 
 class WikidataClient:
     def __init__(self, config: Config) -> None:
         self.config = config
+        http2 = config.http2 and _http2_available()
+        if config.http2 and not http2:
+            logger.warning("HTTP/2 requested but the h2 package is not installed")
+        # One pool per host, so that slow SPARQL queries never hold the
+        # connections needed by quick Wikibase API lookups.
         self.session = httpx.AsyncClient(
             headers={"User-Agent": config.user_agent},
             timeout=config.timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.api_max_connections,
+                max_keepalive_connections=config.api_max_connections,
+                keepalive_expiry=config.api_keepalive_expiry,
+            ),
+        )
+        self.sparql_session = httpx.AsyncClient(
+            headers={"User-Agent": config.user_agent},
+            timeout=config.timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.sparql_max_connections,
+                max_keepalive_connections=config.sparql_max_connections,
+                keepalive_expiry=config.sparql_keepalive_expiry,
+            ),
+        )
+        self._api_limiter = TokenBucket(config.rate_limit, config.rate_limit_burst)
+        self._sparql_limiter = TokenBucket(config.sparql_rate_limit, config.rate_limit_burst)
+        self._retry = RetryPolicy(
+            config.max_retries, config.retry_backoff, config.retry_backoff_max
+        )
+        self._sparql_retry = RetryPolicy(
+            config.max_retries,
+            config.retry_backoff,
+            config.retry_backoff_max,
+            status_codes=SPARQL_RETRYABLE_STATUS_CODES,
+            errors=SPARQL_RETRYABLE_ERRORS,
+        )
+        self._cache = ResponseCache(config.cache_max_entries, config.cache_ttl)
+        self._sparql_cache = SparqlCache(config.sparql_cache_max_bytes, config.sparql_cache_ttl)
+        self._inflight = SingleFlight()
+        self._background: Set["asyncio.Future[Any]"] = set()
+        self._snapshot = Snapshot(config.snapshot_path) if config.snapshot_path else None
+        self._prefix_index = PrefixIndex(config.prefix_index_max_terms)
+        self._revalidation = {"checked": 0, "unchanged": 0}
+        self._guard_stats = {"limited": 0, "expensive": 0, "rejected": 0}
+        self._store = (
+            EntityStore(config.cache_path, config.disk_cache_ttl)
+            if config.cache_path
+            else None
         )
-        self._rate_limiter = asyncio.Semaphore(config.rate_limit)
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for task in list(self._background):
+            task.cancel()
         await self.session.aclose()
+        await self.sparql_session.aclose()
+        if self._store:
+            self._store.close()
+        if self._snapshot:
+            self._snapshot.close()
+
+    async def warm_up(self) -> None:
+        """Open connections (DNS, TCP and TLS) to both hosts ahead of the first call."""
+        targets = [
+            (self.session, self.config.wikibase_api_url, self._api_limiter),
+            (self.sparql_session, self.config.sparql_endpoint, self._sparql_limiter),
+        ]
+        results = await asyncio.gather(
+            *(self._head(*target) for target in targets), return_exceptions=True
+        )
+        for (_, url, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.debug("Connection warm-up to %s failed: %s", url, result)
 
-    async def _make_request(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        async with self._rate_limiter:
+    async def _head(
+        self, session: httpx.AsyncClient, url: str, limiter: TokenBucket
+    ) -> None:
+        await limiter.acquire()
+        await session.head(url)
+
+    async def prewarm(self) -> None:
+        """Load the configured hot entities, properties and queries into the caches.
+
+        Entities go through the same batched, rate-limited path as tool calls,
+        with the parameters of a default ``get_entity`` call and of label
+        resolution, so that those calls hit the cache.
+        Queries run one at a time, to leave rate-limit tokens for real calls.
+        """
+        config = self.config
+        language = [config.default_language]
+        ids = list(dict.fromkeys(config.prewarm_entities + config.prewarm_properties))
+        loads = []
+        if ids:
+            loads.append(self._load_entities(ids, _entity_params(language, False), "prewarm"))
+            loads.append(self._load_entities(
+                ids, {**_entity_params(language, False), "props": "labels"}, "prewarm"
+            ))
+        results = await asyncio.gather(*loads, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Prewarming entities failed: %s", result)
+            elif result[1]:
+                logger.warning("Could not prewarm: %s", ", ".join(sorted(result[1])))
+
+        queries = []
+        for query in config.prewarm_queries:
+            if "{entity}" in query:
+                # "{entity}" cannot appear in valid SPARQL, unlike "$entity".
+                if not config.prewarm_entities:
+                    logger.warning(
+                        "Skipping prewarm query template, prewarm_entities is empty: %s", query
+                    )
+                queries.extend(
+                    query.replace("{entity}", entity_id) for entity_id in config.prewarm_entities
+                )
+            else:
+                queries.append(query)
+        for query in queries:
             try:
-                response = await self.session.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-            except httpx.TimeoutException:
-                raise Exception(f"Request timed out after {self.config.timeout} seconds")
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429:
-                    raise Exception("Wikidata API is rate limiting requests. Please wait and try again.")
-                elif e.response.status_code >= 500:
-                    raise Exception(f"Wikidata server error ({e.response.status_code}). Please try again later.")
+                await self.sparql_query(query)
+            except Exception as e:
+                logger.warning("Prewarming SPARQL query failed: %s", e)
+
+        logger.info("Prewarmed %d entities and %d SPARQL queries", len(ids), len(queries))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "cache": self._cache.stats(),
+            "sparql_cache": self._sparql_cache.stats(),
+            "coalescing": self._inflight.stats(),
+            "rate_limit": {
+                "api": self._api_limiter.stats(),
+                "sparql": self._sparql_limiter.stats(),
+            },
+            "retry": {"api": self._retry.stats(), "sparql": self._sparql_retry.stats()},
+            "revalidation": dict(self._revalidation),
+            "sparql_guard": dict(self._guard_stats),
+        }
+        if self._store:
+            stats["disk_cache"] = self._store.stats()
+        stats["prefix_index"] = self._prefix_index.stats()
+        if self._snapshot:
+            stats["snapshot"] = self._snapshot.stats()
+        return stats
+
+    async def _make_request(
+        self, url: str, params: Dict[str, Any], tool: str = "api"
+    ) -> Dict[str, Any]:
+        key = make_key({"url": url, **params})
+        cached = self._cache.get(tool, key)
+        if cached is not None:
+            return cached
+
+        data = await self._load_persisted(params)
+        if data is None:
+            data = await self._fetch_json(url, params)
+            if "error" not in data:
+                await self._persist(params, data)
+        if "error" not in data:
+            self._cache.set(key, data)
+        return data
+
+    async def _load_persisted(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self._store is None or params.get("action") != "wbsearchentities":
+            return None
+        return await self._store.get_search(make_key(params))
+
+    async def _persist(self, params: Dict[str, Any], data: Dict[str, Any]) -> None:
+        if self._store is None or params.get("action") != "wbsearchentities":
+            return
+        await self._store.put_search(make_key(params), data)
+
+    def _entity_key(self, entity_id: str, params: Dict[str, Any]) -> str:
+        # Languages are left out of the key: one entry accumulates the terms
+        # of every language requested so far.
+        shared = {
+            key: value for key, value in params.items()
+            if key not in ("languages", "languagefallback")
+        }
+        return make_key({"url": self.config.wikibase_api_url, **shared, "ids": entity_id})
+
+    async def _load_entities(
+        self, entity_ids: List[str], params: Dict[str, Any], tool: str
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Resolve entities from the caches, then in concurrent 50-ID batches.
+
+        ``params`` holds the ``wbgetentities`` parameters other than ``ids``.
+        Cached entities are language-agnostic: an entry lacking some of the
+        requested languages is completed with a terms-only request rather
+        than refetched. Expired entries are revalidated against the latest
+        revision of their entity and only refetched if it changed. Returns
+        the entities found and an error message per missing ID; a batch that
+        fails reports its IDs without affecting the others.
+        """
+        languages = params.get("languages")
+        fallback = bool(params.get("languagefallback"))
+        props = params.get("props")
+        term_props = [
+            prop for prop in TERM_PROPS if not props or prop in props.split("|")
+        ]
+        requested: Optional[Set[str]] = set()
+        if term_props:
+            requested = set(languages.split("|")) if languages else None
+
+        found: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+
+        def view(entry: Dict[str, Any]) -> Dict[str, Any]:
+            return filter_entity(entry["entity"], languages, props, fallback)
+
+        def remember(entity_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+            self._cache.set(self._entity_key(entity_id, params), entry)
+            found[entity_id] = view(entry)
+            return found[entity_id]
+
+        def revalidable(entry: Dict[str, Any]) -> bool:
+            return (
+                self.config.revalidate
+                and entry["revision"] is not None
+                and _covers(entry, requested, fallback)
+            )
+
+        partial: Dict[str, Dict[str, Any]] = {}
+        stale: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for entity_id in entity_ids:
+            entry, fresh = self._cache.get_stale(tool, self._entity_key(entity_id, params))
+            if entry is not None and not fresh:
+                if revalidable(entry):
+                    stale[entity_id] = entry
+                    continue
+                entry = None
+            if entry is not None and _covers(entry, requested, fallback):
+                found[entity_id] = view(entry)
+                continue
+            if entry is not None:
+                partial[entity_id] = entry
+            pending.append(entity_id)
+
+        if pending and self._snapshot is not None:
+            remaining = []
+            for entity_id in pending:
+                entity = self._snapshot.get_entity(entity_id)
+                if entity is None:
+                    remaining.append(entity_id)
+                    continue
+                # Snapshot entities are never revalidated against the live API.
+                entry = _entity_entry(
+                    filter_entity(entity, None, props), self._snapshot.languages, False
+                )
+                entry["revision"] = None
+                if _covers(entry, requested, fallback):
+                    remember(entity_id, entry)
+                    continue
+                # Languages the snapshot was built without come from the API.
+                partial[entity_id] = entry
+                remaining.append(entity_id)
+            pending = remaining
+
+        persistable = self._store is not None and "props" not in params
+        store_language = (languages or "") + ("+fallback" if fallback else "")
+        if pending and persistable:
+            stored, expired = await self._store.get_entities(pending, store_language)
+            for entity_id, entity in stored.items():
+                remember(
+                    entity_id,
+                    _entity_entry(entity, requested, fallback, partial.get(entity_id)),
+                )
+            for entity_id, entity in expired.items():
+                entry = _entity_entry(entity, requested, fallback)
+                if entity_id not in partial and revalidable(entry):
+                    stale[entity_id] = entry
+            pending = [
+                entity_id for entity_id in pending
+                if entity_id not in stored and entity_id not in stale
+            ]
+
+        if stale:
+            unchanged = await self._revalidate(stale)
+            for entity_id, entry in stale.items():
+                if entity_id in unchanged:
+                    remember(entity_id, entry)
                 else:
-                    raise Exception(f"Wikidata API error {e.response.status_code}: {e.response.text[:200]}")
-            except httpx.ConnectError:
-                raise Exception(f"Cannot connect to Wikidata API. Check your internet connection.")
+                    pending.append(entity_id)
+            if persistable:
+                await self._store.touch_entities(unchanged, store_language)
+
+        # Entities never seen are fetched in full; partially cached ones only
+        # need the terms of their missing languages. Revision info is always
+        # requested so that entries can be revalidated later.
+        full_params = params
+        if props and "info" not in props.split("|"):
+            full_params = {**params, "props": f"{props}|info"}
+        batches: List[Tuple[List[str], Dict[str, Any], Optional[Set[str]]]] = [
+            (chunk, full_params, requested)
+            for chunk in _chunked([entity_id for entity_id in pending if entity_id not in partial])
+        ]
+        groups: Dict[Optional[Tuple[str, ...]], List[str]] = {}
+        for entity_id in pending:
+            if entity_id in partial:
+                entry = partial[entity_id]
+                known = entry["fallback"] if fallback else entry["languages"]
+                missing = tuple(sorted(requested - known)) if requested is not None else None
+                groups.setdefault(missing, []).append(entity_id)
+        for missing, ids in groups.items():
+            terms_params = {key: value for key, value in params.items() if key != "languages"}
+            terms_params["props"] = "|".join(term_props + ["info"])
+            if missing is not None:
+                terms_params["languages"] = "|".join(missing)
+            covered = set(missing) if missing is not None else None
+            batches.extend((chunk, terms_params, covered) for chunk in _chunked(ids))
+
+        results = await asyncio.gather(
+            *(self._fetch_entity_chunk(chunk, fetch_params) for chunk, fetch_params, _ in batches),
+            return_exceptions=True,
+        )
+
+        fetched_views: Dict[str, Any] = {}
+        for (chunk, _, covered), result in zip(batches, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                # One failed batch must not discard entities resolved from the
+                # caches, the snapshot or the other batches.
+                logger.warning("Fetching %d entities failed: %s", len(chunk), result)
+                message = str(result) or f"Fetching entities failed: {type(result).__name__}"
+                errors.update({entity_id: message for entity_id in chunk})
+                continue
+            fetched, failed = result
+            for entity_id, entity in fetched.items():
+                self._prefix_index.add_entity(entity)
+                fetched_views[entity_id] = remember(
+                    entity_id,
+                    _entity_entry(entity, covered, fallback, partial.get(entity_id)),
+                )
+            errors.update(failed)
+        if persistable and fetched_views:
+            await self._store.put_entities(fetched_views, store_language)
+
+        return found, errors
+
+    async def _revalidate(self, entries: Dict[str, Dict[str, Any]]) -> List[str]:
+        """IDs of cached entities whose revision is still the latest one.
+
+        Revisions are checked with ``action=query&prop=info``, 50 titles per
+        request, which costs a fraction of refetching the entities.
+        """
+        titles = {_page_title(entity_id): entity_id for entity_id in entries}
+        try:
+            results = await asyncio.gather(*(
+                self._fetch_json(self.config.wikibase_api_url, {
+                    "action": "query",
+                    "prop": "info",
+                    "titles": "|".join(chunk),
+                    "format": "json",
+                    "formatversion": 2,
+                })
+                for chunk in _chunked(list(titles))
+            ))
+        except Exception as e:
+            logger.warning("Revision check failed, refetching entities: %s", e)
+            results = []
+
+        revisions = {}
+        for data in results:
+            for page in data.get("query", {}).get("pages", []):
+                entity_id = titles.get(page.get("title"))
+                if entity_id is not None and not page.get("missing"):
+                    revisions[entity_id] = page.get("lastrevid")
+
+        unchanged = [
+            entity_id for entity_id, entry in entries.items()
+            if revisions.get(entity_id) == entry["revision"]
+        ]
+        self._revalidation["checked"] += len(entries)
+        self._revalidation["unchanged"] += len(unchanged)
+        return unchanged
+
+    async def _fetch_entity_chunk(
+        self, entity_ids: List[str], params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        found: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        remaining = list(entity_ids)
+
+        while remaining:
+            data = await self._fetch_json(
+                self.config.wikibase_api_url, {**params, "ids": "|".join(remaining)}
+            )
+            if "error" in data:
+                # The API rejects the whole batch for a single malformed or unknown
+                # ID; drop the offending ID and retry with the rest.
+                error = data["error"]
+                bad_id = error.get("id")
+                message = error.get("info", "Unknown Wikidata API error")
+                if bad_id not in remaining:
+                    errors.update({entity_id: message for entity_id in remaining})
+                    break
+                errors[bad_id] = f"Entity {bad_id} not found"
+                remaining.remove(bad_id)
+                continue
+
+            entities = data.get("entities", {})
+            for entity_id in remaining:
+                entity = entities.get(entity_id)
+                if entity is None or "missing" in entity:
+                    errors[entity_id] = f"Entity {entity_id} not found"
+                else:
+                    found[entity_id] = entity
+            break
+
+        return found, errors
+
+    async def _fetch_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = make_key({"url": url, **params})
+        return await self._inflight.do(key, lambda: self._get_json(url, params))
+
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self._retry.send(
+                "GET",
+                lambda: self.session.get(url, params=params),
+                self._api_limiter,
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException:
+            raise Exception(f"Request timed out after {self.config.timeout} seconds")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                raise Exception("Wikidata API is rate limiting requests. Please wait and try again.")
+            elif e.response.status_code >= 500:
+                raise Exception(f"Wikidata server error ({e.response.status_code}). Please try again later.")
+            else:
+                raise Exception(f"Wikidata API error {e.response.status_code}: {e.response.text[:200]}")
+        except httpx.ConnectError:
+            raise Exception(f"Cannot connect to Wikidata API. Check your internet connection.")
 
     async def search_entities(
         self, 
         query: str, 
-        language: str = "en",
+        language: Union[str, List[str]] = "en",
         limit: int = 10,
         type: Optional[str] = None
     ) -> Dict[str, Any]:
+        languages = _language_list(language)
         params = {
             "action": "wbsearchentities",
             "search": query,
-            "language": language,
+            "language": languages[0],
             "limit": min(limit, self.config.max_results),
             "format": "json",
         }
@@ -61,7 +613,18 @@ class WikidataClient:
         if type:
             params["type"] = type
 
-        data = await self._make_request(self.config.wikibase_api_url, params)
+        local = self._search_locally(query, languages, params["limit"], type)
+        if len(local) >= params["limit"]:
+            return {"entities": await self._with_terms(local, languages)}
+
+        try:
+            data = await self._make_request(
+                self.config.wikibase_api_url, params, tool="search_entities"
+            )
+        except Exception:
+            if local:
+                return {"entities": await self._with_terms(local, languages)}
+            raise
         
         entities = []
         for item in data.get("search", []):
@@ -71,37 +634,219 @@ class WikidataClient:
                 "description": item.get("description", ""),
                 "url": f"https://www.wikidata.org/entity/{item.get('id')}"
             })
+            texts = [item.get("label")] + item.get("aliases", [])
+            match = item.get("match", {})
+            if match.get("language") == languages[0]:
+                texts.append(match.get("text"))
+            self._prefix_index.add(
+                item.get("id"),
+                languages[0],
+                [text for text in texts if text],
+                item.get("label"),
+                item.get("description"),
+            )
+
+        return {"entities": await self._with_terms(entities, languages)}
 
-        return {"entities": entities}
+    def _search_locally(
+        self, query: str, languages: List[str], limit: int, type: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        hits: List[Dict[str, str]] = []
+        seen: Set[str] = set()
+        for language in languages:
+            candidates = self._prefix_index.search(query, language, limit, type)
+            if self._snapshot is not None and len(candidates) < limit:
+                for hit in self._snapshot.search(query, language, limit, type):
+                    entity = self._snapshot.get_entity(hit["id"]) or {}
+                    description = entity.get("descriptions", {}).get(language, {})
+                    candidates.append({**hit, "description": description.get("value", "")})
+            for hit in candidates:
+                if hit["id"] not in seen and len(hits) < limit:
+                    seen.add(hit["id"])
+                    hits.append(hit)
+
+        return [
+            {
+                "id": hit["id"],
+                "label": hit.get("label", hit["id"]),
+                "description": hit.get("description", ""),
+                "url": f"https://www.wikidata.org/entity/{hit['id']}"
+            }
+            for hit in hits
+        ]
+
+    async def _with_terms(
+        self, results: List[Dict[str, Any]], languages: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Add labels and descriptions in every requested language to search results.
+
+        With a single language, results are returned unchanged. Otherwise the
+        terms of all results are loaded in one batched, cached request, and
+        ``label``/``description`` follow the order of ``languages``.
+        """
+        if len(languages) < 2 or not results:
+            return results
+
+        params = {**_entity_params(languages, False), "props": "labels|descriptions"}
+        try:
+            found, _ = await self._load_entities(
+                [result["id"] for result in results], params, "search_entities"
+            )
+        except Exception as e:
+            logger.warning("Loading search result terms failed: %s", e)
+            return results
+
+        enriched = []
+        for result in results:
+            entity = found.get(result["id"])
+            if entity is None:
+                enriched.append(result)
+                continue
+            labels = entity.get("labels", {})
+            descriptions = entity.get("descriptions", {})
+            enriched.append({
+                **result,
+                "label": _first_term(labels, languages) or result["label"],
+                "description": _first_term(descriptions, languages) or result["description"],
+                "labels": {lang: term["value"] for lang, term in labels.items()},
+                "descriptions": {lang: term["value"] for lang, term in descriptions.items()},
+            })
+        return enriched
 
     async def get_entity(
         self,
         entity_id: str,
-        language: str = "en",
+        language: Union[str, List[str]] = "en",
         properties: Optional[List[str]] = None,
-        simplified: bool = False
+        simplified: bool = False,
+        claims: Optional[List[str]] = None,
+        max_statements: Optional[int] = None,
+        include_references: bool = True,
+        include_qualifiers: bool = True,
+        max_bytes: Optional[int] = None,
+        language_fallback: bool = False
     ) -> Dict[str, Any]:
-        params = {
-            "action": "wbgetentities",
-            "ids": entity_id,
-            "languages": language,
-            "format": "json",
-        }
+        entity_id = entity_id.strip()
+        batch = await self.get_entities(
+            [entity_id], language, properties, simplified, claims, max_statements,
+            include_references, include_qualifiers, max_bytes, language_fallback
+        )
+        if entity_id not in batch["entities"]:
+            raise ValueError(batch["errors"].get(entity_id, f"Entity {entity_id} not found"))
+
+        result = {"entity": batch["entities"][entity_id]}
+        if entity_id in batch.get("truncated", {}):
+            result["truncated"] = batch["truncated"][entity_id]
+        return result
+
+    async def get_entities(
+        self,
+        entity_ids: List[str],
+        language: Union[str, List[str]] = "en",
+        properties: Optional[List[str]] = None,
+        simplified: bool = False,
+        claims: Optional[List[str]] = None,
+        max_statements: Optional[int] = None,
+        include_references: bool = True,
+        include_qualifiers: bool = True,
+        max_bytes: Optional[int] = None,
+        language_fallback: bool = False
+    ) -> Dict[str, Any]:
+        languages = _language_list(language)
+        params = _entity_params(languages, language_fallback)
+        # Accept the same spellings as property filters elsewhere (p31, wdt:P31).
+        claims = _property_ids(claims) if claims else claims
 
         if properties:
             params["props"] = "|".join(properties)
 
-        data = await self._make_request(self.config.wikibase_api_url, params)
-        
-        if "entities" not in data or entity_id not in data["entities"]:
-            raise ValueError(f"Entity {entity_id} not found")
+        entity_ids = list(dict.fromkeys(entity_id.strip() for entity_id in entity_ids))
+        found, errors = await self._load_entities(entity_ids, params, "get_entities")
+
+        entities, truncations = await self._shape_entities(
+            {entity_id: found[entity_id] for entity_id in entity_ids if entity_id in found},
+            languages, simplified, claims, max_statements,
+            include_references, include_qualifiers, max_bytes
+        )
+
+        result = {"entities": entities, "errors": errors}
+        if truncations:
+            result["truncated"] = truncations
+        return result
+
+    async def _shape_entities(
+        self,
+        found: Dict[str, Dict[str, Any]],
+        languages: List[str],
+        simplified: bool,
+        claims: Optional[List[str]],
+        max_statements: Optional[int],
+        include_references: bool,
+        include_qualifiers: bool,
+        max_bytes: Optional[int]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        entities = {}
+        for entity_id, entity_data in found.items():
+            entity = project_entity(
+                entity_data, claims, max_statements, include_references, include_qualifiers
+            )
+            if simplified:
+                entity = self._simplify_entity(entity, languages[0])["entity"]
+            entities[entity_id] = entity
 
-        entity_data = data["entities"][entity_id]
-        
         if simplified:
-            return self._simplify_entity(entity_data, language)
-        
-        return {"entity": entity_data}
+            await self._resolve_labels(list(entities.values()), languages)
+
+        truncations = {}
+        if max_bytes:
+            claims_key = "properties" if simplified else "claims"
+            for entity_id, entity in entities.items():
+                entities[entity_id], truncated = truncate_to_budget(
+                    entity, max_bytes, claims_key
+                )
+                if truncated:
+                    truncations[entity_id] = truncated
+
+        return entities, truncations
+
+    async def _resolve_labels(
+        self, entities: List[Dict[str, Any]], languages: List[str]
+    ) -> None:
+        """Fill in labels of properties and item values of simplified entities.
+
+        All referenced IDs are resolved together through batched
+        ``wbgetentities props=labels`` requests, which go through the cache.
+        Each label is taken from the first of ``languages`` that has one.
+        """
+        referenced = set()
+        for entity in entities:
+            for prop_id, values in entity["properties"].items():
+                referenced.add(prop_id)
+                referenced.update(value["value"] for value in values if "label" in value)
+        if not referenced:
+            return
+
+        params = {**_entity_params(languages, False), "props": "labels"}
+        try:
+            found, _ = await self._load_entities(sorted(referenced), params, "labels")
+        except Exception as e:
+            # Labels are a convenience; keep the bare IDs rather than failing.
+            logger.warning("Label resolution failed: %s", e)
+            found = {}
+        labels = {}
+        for entity_id, data in found.items():
+            label = _first_term(data.get("labels", {}), languages)
+            if label is not None:
+                labels[entity_id] = label
+
+        for entity in entities:
+            entity["property_labels"] = {
+                prop_id: labels.get(prop_id, prop_id) for prop_id in entity["properties"]
+            }
+            for values in entity["properties"].values():
+                for value in values:
+                    if "label" in value:
+                        value["label"] = labels.get(value["value"], value["value"])
 
     def _simplify_entity(self, entity_data: Dict[str, Any], language: str) -> Dict[str, Any]:
         entity = {
@@ -132,7 +877,7 @@ class WikidataClient:
                         if isinstance(value, dict) and "id" in value:
                             prop_values.append({
                                 "value": value["id"],
-                                "label": value.get("label", value["id"])
+                                "label": value["id"]
                             })
                         else:
                             prop_values.append({"value": str(value)})
@@ -144,38 +889,246 @@ class WikidataClient:
 
     async def sparql_query(
         self,
-        query: str,
+        query: Optional[str] = None,
         format: str = "json",
-        limit: int = 100
+        limit: int = 100,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        layout = format if format in COMPACT_FORMATS else None
+        if layout:
+            format = "json"
+
+        if cursor or page_size:
+            result = await self._sparql_page(query, format, page_size, cursor)
+        elif not query:
+            raise ValueError("Either query or cursor is required")
+        else:
+            query, heavy = self._guard_query(query, min(limit, 1000))
+            result = await self._run_sparql(query, format, tool="sparql_query", heavy=heavy)
+
+        if layout:
+            return compact_results(result, columnar=layout == "columnar")
+        return result
+
+    def _guard_query(
+        self, query: str, default_limit: Optional[int] = None
+    ) -> Tuple[str, bool]:
+        """Check the estimated cost of a query before it is sent to WDQS.
+
+        A query without a top-level LIMIT gets ``default_limit``. Prohibitive
+        queries are rejected, unless the guard is set to warn or off.
+        Returns the query to run and whether it is expensive, in which case
+        it is routed to the heavy endpoint with WDQS's own timeout.
+        """
+        analysis = analyze_query(query)
+        if default_limit is not None and analysis.limit is None and analysis.form != "ASK":
+            query = set_limit_offset(query, default_limit, analysis.offset)
+            self._guard_stats["limited"] += 1
+            # Rate the query that is actually sent, LIMIT included.
+            analysis = analyze_query(query)
+
+        mode = self.config.sparql_guard
+        if mode == "off":
+            return query, False
+
+        cost = analysis.cost
+        if cost == "prohibitive":
+            reasons = "; ".join(analysis.reasons("prohibitive"))
+            if mode == "enforce":
+                self._guard_stats["rejected"] += 1
+                raise ValueError(
+                    f"Query rejected as too expensive for WDQS: {reasons}. "
+                    "Bind more terms with constants or VALUES, or narrow the class."
+                )
+            logger.warning("Running a query estimated as prohibitive: %s", reasons)
+        if cost != "cheap":
+            self._guard_stats["expensive"] += 1
+            logger.debug("Expensive SPARQL query: %s", "; ".join(m for _, m in analysis.issues))
+        return query, cost != "cheap"
+
+    async def _sparql_page(
+        self,
+        query: Optional[str],
+        format: str,
+        page_size: Optional[int],
+        cursor: Optional[str]
     ) -> Dict[str, Any]:
-        if "LIMIT" not in query.upper():
-            query += f" LIMIT {min(limit, 1000)}"
+        """Return one LIMIT/OFFSET page of a query and a cursor for the next one.
+
+        The query's own LIMIT/OFFSET, if any, bound the whole paginated range.
+        The next page is prefetched in the background while the caller
+        consumes the current one. Cursors come back from the client, so
+        their state is validated and every page goes through the cost guard.
+        """
+        if format != "json":
+            raise ValueError("Pagination is only supported with the json format")
+        if cursor:
+            state = decode_cursor(cursor)
+            if not (
+                isinstance(state["q"], str)
+                and _is_count(state["o"], 0)
+                and _is_count(state["n"], 1)
+                # Issued cursors always stop short of the end of their range.
+                and (state.get("e") is None or _is_count(state["e"], state["o"] + 1))
+            ):
+                raise ValueError("Invalid pagination cursor")
+            state["n"] = min(state["n"], self.config.sparql_max_rows)
+        else:
+            if not query:
+                raise ValueError("Either query or cursor is required")
+            total, start = get_limit_offset(query)
+            start = start or 0
+            state = {
+                "q": set_limit_offset(query, None),
+                "o": start,
+                "e": start + total if total is not None else None,
+                "n": min(page_size, self.config.sparql_max_rows),
+            }
+
+        offset = state["o"]
+        size = state["n"]
+        if state.get("e") is not None:
+            size = min(size, state["e"] - offset)
+
+        page_query, heavy = self._guard_query(set_limit_offset(state["q"], size, offset))
+        result = await self._run_sparql(page_query, tool="sparql_query", heavy=heavy)
+        rows = len(result.get("results", {}).get("bindings", []))
+        next_offset = offset + rows
+
+        page = {"offset": offset, "size": rows, "next_cursor": None}
+        # A page cut short by the row or byte budget continues where it stopped.
+        more = rows == size or (rows > 0 and result.get("truncated"))
+        if more and (state.get("e") is None or next_offset < state["e"]):
+            next_state = {**state, "o": next_offset}
+            page["next_cursor"] = encode_cursor(next_state)
+            next_size = size
+            if state.get("e") is not None:
+                next_size = min(size, state["e"] - next_offset)
+            self._in_background(
+                self._run_sparql(
+                    set_limit_offset(state["q"], next_size, next_offset),
+                    tool="sparql_prefetch",
+                    heavy=heavy,
+                )
+            )
+
+        return {**result, "page": page}
+
+    def _in_background(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
 
+    def _background_done(self, task: "asyncio.Future[Any]") -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Background request failed: %s", task.exception())
+
+    async def _run_sparql(
+        self, query: str, format: str = "json", tool: str = "sparql", heavy: bool = False
+    ) -> Dict[str, Any]:
+        # Equivalent queries share entries whatever their layout, comments,
+        # predefined prefix declarations or the position of LIMIT/OFFSET.
+        limit, offset = get_limit_offset(query)
+        offset = offset or 0
+        body = set_limit_offset(query, None)
+        base = make_key({"query": normalize_query(body), "format": format})
+        key = make_key({"base": base, "limit": limit, "offset": offset})
+
+        if format != "json":
+            cached = self._sparql_cache.get(tool, key)
+            if cached is not None:
+                return cached
+            result = await self._fetch_sparql(query, format, heavy)
+            self._sparql_cache.set(key, result, len(dumps(result).encode("utf-8")))
+            return result
+
+        # JSON results are cached as LIMIT/OFFSET windows of the base query,
+        # so any slice they cover is answered locally and a slice they only
+        # start needs just its remaining rows.
+        sliced = self._sparql_cache.get_slice(tool, base, offset, limit)
+        if sliced is not None:
+            result, covered = sliced
+            if covered:
+                return result
+            rows = result["results"]["bindings"]
+            rest = await self._run_sparql(
+                set_limit_offset(body, None if limit is None else limit - len(rows), offset + len(rows)),
+                format,
+                tool,
+                heavy,
+            )
+            return {**rest, "results": {"bindings": rows + rest["results"]["bindings"]}}
+
+        result = await self._fetch_sparql(query, format, heavy)
+        self._sparql_cache.set(
+            key, result, len(dumps(result).encode("utf-8")), base, (offset, limit)
+        )
+        return result
+
+    async def _fetch_sparql(
+        self, query: str, format: str, heavy: bool = False
+    ) -> Dict[str, Any]:
+        endpoint = self.config.sparql_endpoint
+        if heavy and self.config.sparql_heavy_endpoint:
+            endpoint = self.config.sparql_heavy_endpoint
+        key = make_key({"url": endpoint, "query": query, "format": format})
+        return await self._inflight.do(
+            key, lambda: self._get_sparql(query, format, endpoint, heavy)
+        )
+
+    async def _get_sparql(
+        self, query: str, format: str, endpoint: str, heavy: bool = False
+    ) -> Dict[str, Any]:
         params = {
             "query": query,
             "format": format
         }
+        # Expensive queries may run as long as WDQS allows; abandoning them
+        # earlier wastes the work already done server-side.
+        timeout = max(self.config.timeout, WDQS_QUERY_TIMEOUT + 5) if heavy else self.config.timeout
+
+        request = self.sparql_session.build_request(
+            "GET",
+            endpoint,
+            params=params,
+            headers={
+                "Accept": f"application/sparql-results+{format}",
+                "User-Agent": self.config.user_agent
+            },
+            timeout=timeout,
+        )
 
         try:
-            response = await self.session.get(
-                self.config.sparql_endpoint,
-                params=params,
-                headers={
-                    "Accept": f"application/sparql-results+{format}",
-                    "User-Agent": self.config.user_agent
-                }
+            response = await self._sparql_retry.send(
+                "GET",
+                lambda: self.sparql_session.send(request, stream=True),
+                self._sparql_limiter,
             )
-            response.raise_for_status()
+            try:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
 
-            if format == "json":
-                return response.json()
-            else:
-                return {"result": response.text}
+                if format == "json":
+                    # Rows are parsed as they arrive and the body is never held
+                    # in memory as a whole; reading stops at the budgets.
+                    return await SparqlResultStream(
+                        response.aiter_bytes(),
+                        max_rows=self.config.sparql_max_rows,
+                        max_bytes=self.config.sparql_max_bytes,
+                    ).collect()
+                else:
+                    await response.aread()
+                    return {"result": response.text}
+            finally:
+                await response.aclose()
                 
         except asyncio.TimeoutError:
-            raise Exception(f"SPARQL query timed out after {self.config.timeout} seconds. Try simplifying your query or increasing the timeout.")
+            raise Exception(f"SPARQL query timed out after {timeout} seconds. Try simplifying your query or increasing the timeout.")
         except httpx.TimeoutException:
-            raise Exception(f"SPARQL query timed out after {self.config.timeout} seconds. Try simplifying your query or increasing the timeout.")
+            raise Exception(f"SPARQL query timed out after {timeout} seconds. Try simplifying your query or increasing the timeout.")
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 500:
                 raise Exception(f"SPARQL server error (500). Your query may have syntax errors or be too complex: {query[:100]}...")
@@ -184,10 +1137,10 @@ class WikidataClient:
             else:
                 raise Exception(f"SPARQL HTTP error {e.response.status_code}: {e.response.text[:200]}")
         except httpx.ConnectError:
-            raise Exception(f"Cannot connect to SPARQL endpoint {self.config.sparql_endpoint}. Check your internet connection.")
+            raise Exception(f"Cannot connect to SPARQL endpoint {endpoint}. Check your internet connection.")
         except Exception as e:
             if "timeout" in str(e).lower():
-                raise Exception(f"SPARQL query timed out after {self.config.timeout} seconds. Try simplifying your query or increasing the timeout.")
+                raise Exception(f"SPARQL query timed out after {timeout} seconds. Try simplifying your query or increasing the timeout.")
             raise Exception(f"SPARQL query failed: {str(e)}")
 
     async def get_relations(
@@ -197,51 +1150,199 @@ class WikidataClient:
         property_filter: Optional[List[str]] = None,
         limit: int = 20
     ) -> Dict[str, Any]:
+        if relation_type in ("outgoing", "incoming"):
+            relations = await self._fetch_relations(
+                entity_id, relation_type, property_filter, limit
+            )
+        elif relation_type == "all":
+            outgoing, incoming = await asyncio.gather(
+                self._fetch_relations(entity_id, "outgoing", property_filter, limit),
+                self._fetch_relations(entity_id, "incoming", property_filter, limit),
+            )
+            # Share the limit between both directions, giving any unused
+            # share of one direction to the other.
+            outgoing_share = max(limit - len(incoming), (limit + 1) // 2)
+            relations = outgoing[:outgoing_share]
+            relations += incoming[:limit - len(relations)]
+        else:
+            raise ValueError(f"Invalid relation_type: {relation_type}")
+
+        return {"relations": relations}
+
+    async def _fetch_relations(
+        self,
+        entity_id: str,
+        relation_type: str,
+        property_filter: Optional[List[str]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        values = ""
+        if property_filter:
+            values = "VALUES ?property {{ {} }}".format(
+                " ".join(f"wdt:{prop}" for prop in _property_ids(property_filter))
+            )
+
         if relation_type == "outgoing":
             query = f"""
             SELECT ?property ?propertyLabel ?target ?targetLabel WHERE {{
+              {values}
               wd:{entity_id} ?property ?target .
               ?prop wikibase:directClaim ?property .
               SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en" . }}
             }}
             LIMIT {limit}
             """
-        elif relation_type == "incoming":
+        else:
             query = f"""
             SELECT ?property ?propertyLabel ?source ?sourceLabel WHERE {{
+              {values}
               ?source ?property wd:{entity_id} .
               ?prop wikibase:directClaim ?property .
               SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en" . }}
             }}
             LIMIT {limit}
             """
-        else:
-            raise ValueError(f"Invalid relation_type: {relation_type}")
 
-        result = await self.sparql_query(query)
+        result = await self._run_sparql(query, tool="get_relations")
         
-        relations = []
-        for binding in result.get("results", {}).get("bindings", []):
-            relation = {
-                "property": binding.get("property", {}).get("value", "").split("/")[-1],
-                "property_label": binding.get("propertyLabel", {}).get("value", ""),
-                "direction": relation_type
-            }
-            
-            if relation_type == "outgoing":
-                relation["target"] = {
-                    "id": binding.get("target", {}).get("value", "").split("/")[-1],
-                    "label": binding.get("targetLabel", {}).get("value", "")
-                }
-            else:
-                relation["source"] = {
-                    "id": binding.get("source", {}).get("value", "").split("/")[-1],
-                    "label": binding.get("sourceLabel", {}).get("value", "")
+        end = "target" if relation_type == "outgoing" else "source"
+        # Literal targets (populations, dates...) keep their lexical form.
+        _, rows = to_rows(result, shorten=local_name, typed=False)
+        return [
+            {
+                "property": prop or "",
+                "property_label": prop_label or "",
+                "direction": relation_type,
+                end: {
+                    "id": "" if node is None else node,
+                    "label": node_label or ""
                 }
-            
-            relations.append(relation)
+            }
+            for prop, prop_label, node, node_label in rows
+        ]
 
-        return {"relations": relations}
+    async def traverse(
+        self,
+        seeds: List[str],
+        properties: Optional[List[str]] = None,
+        depth: int = 1,
+        direction: str = "outgoing",
+        max_nodes: int = 100,
+        max_edges: int = 500,
+        language: str = "en"
+    ) -> Dict[str, Any]:
+        """Breadth-first traversal of the item graph from ``seeds``.
+
+        Each frontier is expanded with SPARQL queries binding up to 50 nodes
+        through ``VALUES``, run concurrently up to ``traverse_concurrency``.
+        Labels of all visited nodes are resolved at the end in batches.
+        """
+        if direction not in ("outgoing", "incoming", "both"):
+            raise ValueError(f"Invalid direction: {direction}")
+        for seed in seeds:
+            if not ITEM_ID.match(seed):
+                raise ValueError(f"Invalid item ID: {seed}")
+        prop_ids = _property_ids(properties) if properties else None
+        directions = ["outgoing", "incoming"] if direction == "both" else [direction]
+
+        visited = list(dict.fromkeys(seeds))[:max_nodes]
+        seen = set(visited)
+        edges: List[List[str]] = []
+        edge_set = set()
+        frontier = list(visited)
+        truncated = False
+        depth_reached = 0
+        semaphore = asyncio.Semaphore(self.config.traverse_concurrency)
+
+        async def expand(batch: List[str], way: str) -> List[List[str]]:
+            async with semaphore:
+                return await self._expand_frontier(
+                    batch, way, prop_ids, max_edges - len(edges) + 1
+                )
+
+        while frontier and depth_reached < depth and not truncated:
+            batches = [
+                frontier[i:i + TRAVERSE_BATCH_SIZE]
+                for i in range(0, len(frontier), TRAVERSE_BATCH_SIZE)
+            ]
+            results = await asyncio.gather(
+                *(expand(batch, way) for way in directions for batch in batches)
+            )
+            depth_reached += 1
+
+            next_frontier = []
+            for triples in results:
+                for subject, prop, obj in triples:
+                    if (subject, prop, obj) in edge_set:
+                        continue
+                    neighbor = obj if subject in seen else subject
+                    if neighbor not in seen:
+                        if len(seen) >= max_nodes:
+                            truncated = True
+                            continue
+                        seen.add(neighbor)
+                        visited.append(neighbor)
+                        next_frontier.append(neighbor)
+                    if len(edges) >= max_edges:
+                        truncated = True
+                        break
+                    edge_set.add((subject, prop, obj))
+                    edges.append([subject, prop, obj])
+            frontier = next_frontier
+
+        labels_params = {
+            "action": "wbgetentities",
+            "props": "labels",
+            "languages": language,
+            "format": "json",
+        }
+        found, _ = await self._load_entities(visited, labels_params, "traverse")
+        nodes = {
+            node: found.get(node, {}).get("labels", {}).get(language, {}).get("value", node)
+            for node in visited
+        }
+
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "depth_reached": depth_reached,
+            "truncated": truncated
+        }
+
+    async def _expand_frontier(
+        self,
+        nodes: List[str],
+        direction: str,
+        prop_ids: Optional[List[str]],
+        limit: int
+    ) -> List[List[str]]:
+        node_values = " ".join(f"wd:{node}" for node in nodes)
+        if prop_ids:
+            constraint = "VALUES ?property {{ {} }}".format(
+                " ".join(f"wdt:{prop}" for prop in prop_ids)
+            )
+        else:
+            constraint = "?prop wikibase:directClaim ?property ."
+        pattern = (
+            "?node ?property ?neighbor ." if direction == "outgoing"
+            else "?neighbor ?property ?node ."
+        )
+
+        query = f"""
+        SELECT ?node ?property ?neighbor WHERE {{
+          VALUES ?node {{ {node_values} }}
+          {constraint}
+          {pattern}
+          FILTER(STRSTARTS(STR(?neighbor), "http://www.wikidata.org/entity/Q"))
+        }}
+        LIMIT {limit}
+        """
+
+        result = await self._run_sparql(query, tool="traverse")
+        _, rows = to_rows(result, shorten=local_name)
+        if direction == "outgoing":
+            return [[node, prop, neighbor] for node, prop, neighbor in rows]
+        return [[neighbor, prop, node] for node, prop, neighbor in rows]
 
     async def find_by_property(
         self,
@@ -250,6 +1351,18 @@ class WikidataClient:
         language: str = "en",
         limit: int = 10
     ) -> Dict[str, Any]:
+        # As for search, the snapshot answers alone only when it has enough
+        # results; otherwise they are a fallback should the endpoint fail.
+        local = []
+        if self._snapshot is not None:
+            for item in self._snapshot.find_by_property(property, value, limit):
+                entity = self._snapshot.get_entity(item) or {}
+                label = entity.get("labels", {}).get(language, {}).get("value", "")
+                local.append({"id": item, "label": label})
+            # Without labels in ``language``, the endpoint has to supply them.
+            if len(local) >= limit and self._snapshot.covers(language):
+                return {"entities": local}
+
         query = f"""
         SELECT ?item ?itemLabel WHERE {{
           ?item wdt:{property} "{value}" .
@@ -258,13 +1371,17 @@ class WikidataClient:
         LIMIT {limit}
         """
 
-        result = await self.sparql_query(query)
+        try:
+            result = await self._run_sparql(query, tool="find_by_property")
+        except Exception:
+            if local:
+                return {"entities": local}
+            raise
         
-        entities = []
-        for binding in result.get("results", {}).get("bindings", []):
-            entities.append({
-                "id": binding.get("item", {}).get("value", "").split("/")[-1],
-                "label": binding.get("itemLabel", {}).get("value", "")
-            })
+        _, rows = to_rows(result, shorten=local_name, typed=False)
+        entities = [
+            {"id": item or "", "label": label or ""}
+            for item, label in rows
+        ]
 
         return {"entities": entities}
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Tests for the SPARQL result cache."""
+
+import time
+from types import SimpleNamespace
+
+from mcp_wikidata import cache as cache_module
+from mcp_wikidata.cache import SparqlCache
+
+BASE = "SELECT ?x WHERE { ?x wdt:P31 wd:Q5 }"
+
+
+def _result(start: int, count: int, truncated: bool = False):
+    result = {
+        "head": {"vars": ["x"]},
+        "results": {"bindings": [
+            {"x": {"type": "literal", "value": str(i)}} for i in range(start, start + count)
+        ]},
+    }
+    if truncated:
+        result["truncated"] = True
+    return result
+
+
+def _values(result):
+    return [int(row["x"]["value"]) for row in result["results"]["bindings"]]
+
+
+def _cache_window(cache, offset, limit, result):
+    cache.set(f"{BASE} LIMIT {limit} OFFSET {offset}", result, 100, BASE, (offset, limit))
+
+
+def test_slice_inside_cached_window_is_a_hit():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 100, _result(0, 100))
+
+    result, covered = cache.get_slice("sparql", BASE, 20, 10)
+
+    assert covered
+    assert _values(result) == list(range(20, 30))
+    assert cache.stats()["namespaces"]["sparql"]["hits"] == 1
+
+
+def test_slice_past_a_short_window_is_covered_as_the_end_of_results():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 100, _result(0, 30))
+
+    result, covered = cache.get_slice("sparql", BASE, 20, 50)
+
+    assert covered
+    assert _values(result) == list(range(20, 30))
+
+
+def test_slice_overlapping_window_end_is_partial():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 50, _result(0, 50))
+
+    result, covered = cache.get_slice("sparql", BASE, 40, 20)
+
+    assert not covered
+    assert _values(result) == list(range(40, 50))
+    assert cache.stats()["namespaces"]["sparql"]["partial"] == 1
+
+
+def test_truncated_window_is_never_taken_as_the_end_of_results():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 100, _result(0, 30, truncated=True))
+
+    result, covered = cache.get_slice("sparql", BASE, 20, 50)
+
+    assert not covered
+    assert "truncated" not in result
+
+
+def test_slice_outside_every_window_is_a_miss():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 10, 10, _result(10, 10))
+
+    assert cache.get_slice("sparql", BASE, 0, 5) is None
+    assert cache.get_slice("sparql", BASE, 20, 5) is None
+    assert cache.get_slice("sparql", "SELECT * WHERE { ?s ?p ?o }", 10, 5) is None
+
+
+def test_slice_prefers_the_window_that_covers_the_range():
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 25, _result(0, 25))
+    _cache_window(cache, 20, 100, _result(20, 100))
+
+    result, covered = cache.get_slice("sparql", BASE, 22, 10)
+
+    assert covered
+    assert _values(result) == list(range(22, 32))
+
+
+def test_ask_result_only_matches_its_own_window():
+    cache = SparqlCache(10_000, 60)
+    ask = {"head": {}, "boolean": True}
+    _cache_window(cache, 0, 1, ask)
+
+    assert cache.get_slice("sparql", BASE, 0, 1) == (ask, True)
+    assert cache.get_slice("sparql", BASE, 0, 5) is None
+
+
+def test_expired_windows_are_ignored(monkeypatch):
+    cache = SparqlCache(10_000, 60)
+    _cache_window(cache, 0, 100, _result(0, 100))
+    later = time.monotonic() + 61
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: later))
+
+    assert cache.get_slice("sparql", BASE, 0, 10) is None
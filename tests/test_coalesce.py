@@ -0,0 +1,116 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from mcp_wikidata.coalesce import SingleFlight
+
+
+class Upstream:
+    """A call that blocks until released and records how it ended."""
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self) -> str:
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"result {self.started}"
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(3)]
+    await _settle()
+    upstream.release.set()
+
+    assert await asyncio.gather(*callers) == ["result 1"] * 3
+    assert upstream.started == 1
+    assert flight.stats() == {"upstream_calls": 1, "saved": 2, "abandoned": 0, "in_flight": 0}
+
+
+async def test_failure_is_shared_and_then_forgotten():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(
+        flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+    )
+    assert [str(result) for result in results] == ["upstream down"] * 2
+    assert await flight.do("key", lambda: asyncio.sleep(0, "ok")) == "ok"
+    assert flight.stats()["upstream_calls"] == 2
+
+
+async def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    await asyncio.gather(
+        flight.do("a", lambda: asyncio.sleep(0, 1)),
+        flight.do("b", lambda: asyncio.sleep(0, 2)),
+    )
+    assert flight.stats()["upstream_calls"] == 2
+
+
+async def test_shared_call_survives_when_one_waiter_is_cancelled():
+    flight = SingleFlight()
+    upstream = Upstream()
+    leaving = asyncio.create_task(flight.do("key", upstream))
+    staying = asyncio.create_task(flight.do("key", upstream))
+    await _settle()
+
+    leaving.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+    upstream.release.set()
+
+    assert await staying == "result 1"
+    assert (upstream.started, upstream.cancelled) == (1, 0)
+    assert flight.stats()["abandoned"] == 0
+
+
+async def test_call_is_cancelled_when_its_last_waiter_goes():
+    flight = SingleFlight()
+    upstream = Upstream()
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(2)]
+    await _settle()
+
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await _settle()
+
+    assert upstream.cancelled == 1
+    assert flight.stats()["abandoned"] == 1
+    assert len(flight) == 0
+
+
+async def test_new_caller_starts_a_fresh_call_after_abandonment():
+    flight = SingleFlight()
+    upstream = Upstream()
+    abandoned = asyncio.create_task(flight.do("key", upstream))
+    await _settle()
+    abandoned.cancel()
+    await asyncio.gather(abandoned, return_exceptions=True)
+
+    fresh = asyncio.create_task(flight.do("key", upstream))
+    await _settle()
+    upstream.release.set()
+
+    assert await fresh == "result 2"
+    assert upstream.started == 2
+    assert flight.stats()["upstream_calls"] == 2
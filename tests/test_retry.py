@@ -0,0 +1,146 @@
+"""Tests for the retry policy."""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from mcp_wikidata import retry as retry_module
+from mcp_wikidata.rate_limit import TokenBucket
+from mcp_wikidata.retry import (
+    SPARQL_RETRYABLE_ERRORS,
+    SPARQL_RETRYABLE_STATUS_CODES,
+    RetryPolicy,
+    deadline_scope,
+)
+
+REQUEST = httpx.Request("GET", "https://query.wikidata.org/sparql")
+
+
+class Upstream:
+    """Replays a fixed sequence of responses and transport errors."""
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self) -> httpx.Response:
+        outcome = self.outcomes[self.calls]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _response(status_code, **headers):
+    return httpx.Response(status_code, headers=headers, request=REQUEST)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(retry_module, "asyncio", SimpleNamespace(sleep=sleep))
+    return delays
+
+
+@pytest.fixture
+def limiter():
+    return TokenBucket(0)
+
+
+def _sparql_policy():
+    return RetryPolicy(
+        3, 1.0, 30.0,
+        status_codes=SPARQL_RETRYABLE_STATUS_CODES,
+        errors=SPARQL_RETRYABLE_ERRORS,
+    )
+
+
+async def test_retry_after_in_seconds_is_honoured(sleeps, limiter):
+    upstream = Upstream(_response(503, **{"Retry-After": "7"}), _response(200))
+    policy = RetryPolicy(3, 1.0, 30.0)
+
+    response = await policy.send("GET", upstream, limiter)
+
+    assert response.status_code == 200
+    assert sleeps == [7.0]
+    assert policy.stats()["retries"] == 1
+
+
+async def test_retry_after_as_http_date_is_honoured(sleeps, limiter):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=20)
+    upstream = Upstream(
+        _response(429, **{"Retry-After": format_datetime(retry_at, usegmt=True)}),
+        _response(200),
+    )
+
+    await RetryPolicy(3, 1.0, 30.0).send("GET", upstream, limiter)
+
+    assert len(sleeps) == 1
+    assert 17 < sleeps[0] <= 20
+
+
+async def test_gives_up_when_delay_exceeds_deadline(sleeps, limiter):
+    upstream = Upstream(_response(503, **{"Retry-After": "10"}), _response(200))
+    policy = RetryPolicy(3, 1.0, 30.0)
+
+    with deadline_scope(5):
+        response = await policy.send("GET", upstream, limiter)
+
+    assert response.status_code == 503
+    assert (upstream.calls, sleeps) == (1, [])
+    assert policy.stats()["exhausted"] == 0
+
+
+async def test_backoff_grows_until_retries_are_exhausted(sleeps, limiter, monkeypatch):
+    monkeypatch.setattr(retry_module.random, "uniform", lambda low, high: high)
+    upstream = Upstream(*[_response(502)] * 4)
+    policy = RetryPolicy(3, 1.0, 3.0)
+
+    response = await policy.send("GET", upstream, limiter)
+
+    assert response.status_code == 502
+    assert sleeps == [1.0, 2.0, 3.0]
+    assert policy.stats()["exhausted"] == 1
+
+
+async def test_non_idempotent_requests_are_not_retried(sleeps, limiter):
+    upstream = Upstream(_response(503), _response(200))
+
+    response = await RetryPolicy(3, 1.0, 30.0).send("POST", upstream, limiter)
+
+    assert (response.status_code, upstream.calls) == (503, 1)
+
+
+async def test_sparql_policy_does_not_retry_server_errors(sleeps, limiter):
+    upstream = Upstream(_response(500), _response(200))
+
+    response = await _sparql_policy().send("GET", upstream, limiter)
+
+    assert (response.status_code, upstream.calls) == (500, 1)
+
+
+async def test_sparql_policy_does_not_retry_read_timeouts(sleeps, limiter):
+    upstream = Upstream(httpx.ReadTimeout("slow query", request=REQUEST), _response(200))
+
+    with pytest.raises(httpx.ReadTimeout):
+        await _sparql_policy().send("GET", upstream, limiter)
+    assert upstream.calls == 1
+
+
+async def test_sparql_policy_retries_connection_failures(sleeps, limiter):
+    upstream = Upstream(
+        httpx.ConnectError("refused", request=REQUEST),
+        _response(504),
+        _response(200),
+    )
+
+    response = await _sparql_policy().send("GET", upstream, limiter)
+
+    assert (response.status_code, upstream.calls) == (200, 3)
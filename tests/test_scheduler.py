@@ -0,0 +1,113 @@
+"""Tests for the tool call scheduler."""
+
+import asyncio
+
+import pytest
+
+from mcp_wikidata.scheduler import Lane, Scheduler
+
+
+def _scheduler(workers=2, sparql=1, queue=10):
+    return Scheduler(workers, [
+        Lane("search", 0, 2, queue),
+        Lane("lookup", 1, 2, queue),
+        Lane("sparql", 2, sparql, queue),
+    ])
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_calls_run_at_once_while_slots_are_free():
+    scheduler = _scheduler()
+
+    assert await scheduler.run("lookup", lambda: asyncio.sleep(0, "done")) == "done"
+    stats = scheduler.stats()
+    assert stats["running"] == 0
+    assert stats["lanes"]["lookup"]["admitted"] == 1
+
+
+async def test_lane_limit_queues_calls_beyond_it():
+    scheduler = _scheduler(workers=4, sparql=1)
+    gate = asyncio.Event()
+    first = asyncio.create_task(scheduler.run("sparql", gate.wait))
+    second = asyncio.create_task(scheduler.run("sparql", gate.wait))
+    await _settle()
+
+    lane = scheduler.stats()["lanes"]["sparql"]
+    assert (lane["running"], lane["queue_depth"]) == (1, 1)
+
+    # The lane is full but the pool is not: other lanes still run at once.
+    await scheduler.run("lookup", lambda: asyncio.sleep(0))
+
+    gate.set()
+    await asyncio.gather(first, second)
+    assert scheduler.stats()["lanes"]["sparql"]["admitted"] == 2
+
+
+async def test_freed_slot_goes_to_highest_priority_lane():
+    scheduler = _scheduler(workers=1, sparql=2)
+    order = []
+    gate = asyncio.Event()
+
+    async def call(name):
+        order.append(name)
+
+    blocker = asyncio.create_task(scheduler.run("sparql", gate.wait))
+    await _settle()
+    queued = [
+        asyncio.create_task(scheduler.run("sparql", lambda: call("sparql"))),
+        asyncio.create_task(scheduler.run("lookup", lambda: call("lookup"))),
+        asyncio.create_task(scheduler.run("search", lambda: call("search"))),
+    ]
+    await _settle()
+    assert order == []
+
+    gate.set()
+    await asyncio.gather(blocker, *queued)
+    assert order == ["search", "lookup", "sparql"]
+
+
+async def test_full_queue_sheds_load():
+    scheduler = _scheduler(workers=1, queue=1)
+    gate = asyncio.Event()
+    running = asyncio.create_task(scheduler.run("lookup", gate.wait))
+    queued = asyncio.create_task(scheduler.run("lookup", gate.wait))
+    await _settle()
+
+    with pytest.raises(Exception, match="Server busy"):
+        await scheduler.run("lookup", gate.wait)
+    assert scheduler.stats()["lanes"]["lookup"]["shed"] == 1
+
+    gate.set()
+    await asyncio.gather(running, queued)
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = _scheduler(workers=1)
+    gate = asyncio.Event()
+    running = asyncio.create_task(scheduler.run("lookup", gate.wait))
+    waiting = asyncio.create_task(scheduler.run("lookup", gate.wait))
+    await _settle()
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.stats()["queue_depth"] == 0
+
+    gate.set()
+    await running
+    assert scheduler.stats()["running"] == 0
+
+
+async def test_slot_of_failed_call_is_released():
+    scheduler = _scheduler(workers=1)
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await scheduler.run("lookup", fail)
+    assert await scheduler.run("lookup", lambda: asyncio.sleep(0, "ok")) == "ok"
@@ -0,0 +1,26 @@
+"""Tests for the server entry point."""
+
+from click.testing import CliRunner
+
+from mcp_wikidata import server
+
+
+def test_main_reads_configuration_from_environment(monkeypatch, tmp_path):
+    configs = []
+
+    class FakeServer:
+        def __init__(self, config):
+            configs.append(config)
+
+        async def run(self):
+            pass
+
+    monkeypatch.setattr(server, "WikidataServer", FakeServer)
+    monkeypatch.setenv("WIKIDATA_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("WIKIDATA_SPARQL_GUARD", "enforce")
+
+    result = CliRunner().invoke(server.main, [])
+
+    assert result.exit_code == 0, result.output
+    assert configs[0].cache_path == str(tmp_path / "cache.db")
+    assert configs[0].sparql_guard == "enforce"
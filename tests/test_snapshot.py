@@ -0,0 +1,248 @@
+"""Tests for building and reading local entity snapshots."""
+
+import gzip
+import json
+import re
+
+import httpx
+import pytest
+
+from mcp_wikidata import snapshot as snapshot_module
+from mcp_wikidata.config import Config
+from mcp_wikidata.snapshot import Snapshot, build_snapshot
+from mcp_wikidata.wikidata_client import WikidataClient
+
+API = re.compile(r"https://www\.wikidata\.org/w/api\.php\?.*")
+SPARQL = re.compile(r"https://query\.wikidata\.org/sparql\?.*")
+
+
+def _terms(values):
+    return {
+        language: {"language": language, "value": value} for language, value in values.items()
+    }
+
+
+def _claim(prop_id, datatype, value):
+    return {"mainsnak": {
+        "snaktype": "value",
+        "property": prop_id,
+        "datatype": datatype,
+        "datavalue": {"value": value},
+    }}
+
+
+ENTITIES = [
+    {
+        "id": "Q42",
+        "type": "item",
+        "labels": _terms({"en": "Douglas Adams", "fr": "Douglas Adams"}),
+        "descriptions": _terms({"en": "English writer", "fr": "écrivain anglais"}),
+        "aliases": {"en": [{"language": "en", "value": "DNA"}]},
+        "claims": {
+            "P31": [_claim("P31", "wikibase-item", {"id": "Q5"})],
+            "P214": [_claim("P214", "external-id", "113230702")],
+        },
+    },
+    {
+        "id": "Q5",
+        "type": "item",
+        "labels": _terms({"en": "human", "fr": "être humain"}),
+        "descriptions": _terms({"en": "any member of Homo sapiens"}),
+        "claims": {"P1709": [_claim("P1709", "url", "http://schema.org/Person")]},
+    },
+    {
+        "id": "Q100",
+        "type": "item",
+        "labels": _terms({"en": "Douglas"}),
+        "claims": {"P214": [_claim("P214", "external-id", "113230702")]},
+    },
+    {
+        "id": "P31",
+        "type": "property",
+        "labels": _terms({"en": "instance of"}),
+        "claims": {},
+    },
+]
+
+
+def _write_dump(path, entities):
+    lines = ["["] + [json.dumps(entity) + "," for entity in entities] + ["]"]
+    with gzip.open(path, "wt", encoding="utf-8") as dump:
+        dump.write("\n".join(lines))
+    return str(path)
+
+
+@pytest.fixture
+def dump(tmp_path):
+    return _write_dump(tmp_path / "dump.json.gz", ENTITIES)
+
+
+def test_build_writes_every_entity(dump, tmp_path):
+    assert build_snapshot(dump, str(tmp_path / "snap")) == 4
+
+    snapshot = Snapshot(str(tmp_path / "snap"))
+    try:
+        assert len(snapshot) == 4
+        assert snapshot.languages is None
+        assert snapshot.get_entity("Q42")["labels"]["fr"]["value"] == "Douglas Adams"
+        assert snapshot.get_entity("P31")["labels"]["en"]["value"] == "instance of"
+        assert snapshot.get_entity("Q6") is None
+        assert snapshot.get_entity("not an id") is None
+        assert (snapshot.hits, snapshot.misses) == (2, 2)
+    finally:
+        snapshot.close()
+
+
+def test_build_keeps_only_requested_ids_and_languages(dump, tmp_path):
+    count = build_snapshot(dump, str(tmp_path / "snap"), ids={"Q42", "Q5"}, languages={"en"})
+
+    snapshot = Snapshot(str(tmp_path / "snap"))
+    try:
+        assert count == 2
+        assert snapshot.languages == {"en"}
+        assert (snapshot.covers("en"), snapshot.covers("fr")) == (True, False)
+        assert set(snapshot.get_entity("Q42")["labels"]) == {"en"}
+        assert snapshot.get_entity("Q100") is None
+    finally:
+        snapshot.close()
+
+
+def test_index_spilled_in_runs_is_sorted_by_numeric_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "_RUN_LINES", 3)
+    numbers = [7, 1000, 3, 42, 12, 5, 999, 1, 100, 20]
+    entities = [
+        {"id": f"Q{number}", "type": "item", "labels": _terms({"en": f"item {number}"})}
+        for number in numbers
+    ]
+    dump = _write_dump(tmp_path / "dump.json.gz", entities)
+
+    assert build_snapshot(dump, str(tmp_path / "snap")) == len(numbers)
+    snapshot = Snapshot(str(tmp_path / "snap"))
+    try:
+        for number in numbers:
+            assert snapshot.get_entity(f"Q{number}")["id"] == f"Q{number}"
+        assert snapshot.get_entity("Q2") is None
+        assert [hit["id"] for hit in snapshot.search("item 1", "en", 10)] == [
+            "Q1", "Q100", "Q1000", "Q12"
+        ]
+    finally:
+        snapshot.close()
+    assert [path.name for path in (tmp_path / "snap").iterdir() if path.is_dir()] == []
+
+
+def test_prefix_search_matches_labels_and_aliases(dump, tmp_path):
+    build_snapshot(dump, str(tmp_path / "snap"))
+    snapshot = Snapshot(str(tmp_path / "snap"))
+    try:
+        assert [hit["id"] for hit in snapshot.search("douglas", "en", 10)] == ["Q100", "Q42"]
+        assert snapshot.search("  DOUGLAS  ad", "en", 10) == [
+            {"id": "Q42", "label": "Douglas Adams"}
+        ]
+        # An alias match shows the entity's label.
+        assert snapshot.search("dna", "en", 10) == [{"id": "Q42", "label": "Douglas Adams"}]
+        assert snapshot.search("être", "fr", 10) == [{"id": "Q5", "label": "être humain"}]
+        assert snapshot.search("instance", "en", 10) == []
+        assert snapshot.search("instance", "en", 10, type="property") == [
+            {"id": "P31", "label": "instance of"}
+        ]
+        assert len(snapshot.search("douglas", "en", 1)) == 1
+    finally:
+        snapshot.close()
+
+
+def test_claims_lookup_matches_string_values_only(dump, tmp_path):
+    build_snapshot(dump, str(tmp_path / "snap"))
+    snapshot = Snapshot(str(tmp_path / "snap"))
+    try:
+        assert snapshot.find_by_property("P214", "113230702", 10) == ["Q100", "Q42"]
+        assert snapshot.find_by_property("P214", "113230702", 1) == ["Q100"]
+        assert snapshot.find_by_property("P214", "11323070", 10) == []
+        assert snapshot.find_by_property("P31", "Q5", 10) == []
+        assert snapshot.find_by_property("P1709", "http://schema.org/Person", 10) == []
+    finally:
+        snapshot.close()
+
+
+class FakeWikidata:
+    """Answers entity term requests and SPARQL lookups, recording them."""
+
+    def __init__(self) -> None:
+        self.api = []
+        self.sparql = []
+
+    def entities(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.api.append(params)
+        languages = params["languages"].split("|")
+        return httpx.Response(200, json={"entities": {
+            entity_id: {
+                "id": entity_id,
+                "type": "item",
+                "lastrevid": 1,
+                "labels": _terms({
+                    language: f"{entity_id} {language}" for language in languages
+                }),
+            }
+            for entity_id in params["ids"].split("|")
+        }})
+
+    def query(self, request: httpx.Request) -> httpx.Response:
+        self.sparql.append(request.url.params["query"])
+        return httpx.Response(200, json={
+            "head": {"vars": ["item", "itemLabel"]},
+            "results": {"bindings": [{
+                "item": {"type": "uri", "value": "http://www.wikidata.org/entity/Q42"},
+                "itemLabel": {"type": "literal", "value": "Douglas Adams", "xml:lang": "fr"},
+            }]},
+        })
+
+
+@pytest.fixture
+def wikidata(httpx_mock):
+    wikidata = FakeWikidata()
+    httpx_mock.add_callback(wikidata.entities, url=API, is_reusable=True, is_optional=True)
+    httpx_mock.add_callback(wikidata.query, url=SPARQL, is_reusable=True, is_optional=True)
+    return wikidata
+
+
+@pytest.fixture
+async def client(dump, tmp_path, wikidata):
+    build_snapshot(dump, str(tmp_path / "snap"), languages={"en"})
+    client = WikidataClient(Config(snapshot_path=str(tmp_path / "snap")))
+    yield client
+    await client.aclose()
+
+
+async def test_snapshot_answers_languages_it_was_built_with(client, wikidata):
+    result = await client.get_entity("Q42", language="en")
+
+    assert result["entity"]["labels"]["en"]["value"] == "Douglas Adams"
+    assert wikidata.api == []
+
+
+async def test_missing_languages_fall_back_to_the_api(client, wikidata):
+    result = await client.get_entity("Q42", language=["en", "fr"])
+
+    labels = {language: term["value"] for language, term in result["entity"]["labels"].items()}
+    assert labels == {"en": "Douglas Adams", "fr": "Q42 fr"}
+    assert "P214" in result["entity"]["claims"]
+    assert len(wikidata.api) == 1
+    assert (wikidata.api[0]["languages"], wikidata.api[0]["props"]) == (
+        "fr", "labels|descriptions|aliases|info"
+    )
+
+    # The completed entry now serves both languages.
+    await client.get_entity("Q42", language="fr")
+    assert len(wikidata.api) == 1
+
+
+async def test_find_by_property_uses_snapshot_only_in_its_languages(client, wikidata):
+    result = await client.find_by_property("P214", "113230702", language="en", limit=2)
+    assert result["entities"] == [
+        {"id": "Q100", "label": "Douglas"}, {"id": "Q42", "label": "Douglas Adams"}
+    ]
+    assert wikidata.sparql == []
+
+    result = await client.find_by_property("P214", "113230702", language="fr", limit=2)
+    assert result["entities"] == [{"id": "Q42", "label": "Douglas Adams"}]
+    assert len(wikidata.sparql) == 1
@@ -0,0 +1,122 @@
+"""Tests for SPARQL query text handling and cost analysis."""
+
+import pytest
+
+from mcp_wikidata.sparql import (
+    QueryAnalysis,
+    get_limit_offset,
+    normalize_query,
+    set_limit_offset,
+)
+
+QUERY = """PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX ex: <http://example.org/>
+# humans with a label
+select  ?item ?limit where {
+  ?item wdt:P31 wd:Q5 .   # instance of human
+  { SELECT ?x WHERE { ?x ?p ?o } LIMIT 5 }
+  FILTER(?limit = "select  # not a comment")
+} limit 10 offset 20"""
+
+
+def test_normalize_ignores_case_whitespace_and_comments():
+    assert normalize_query("SELECT ?x WHERE { ?x wdt:P31 wd:Q5 }") == normalize_query(
+        "select ?x   # any\nwhere{?x wdt:P31 wd:Q5}"
+    )
+
+
+def test_normalize_drops_only_builtin_prefix_declarations():
+    normalized = normalize_query(QUERY)
+
+    assert "PREFIX wd:" not in normalized
+    assert "PREFIX ex: <http://example.org/>" in normalized
+    assert normalize_query(
+        "PREFIX wd: <http://example.org/other/> SELECT * WHERE { ?s ?p wd:Q5 }"
+    ).startswith("PREFIX wd: <http://example.org/other/>")
+
+
+def test_normalize_leaves_strings_and_variables_untouched():
+    normalized = normalize_query(QUERY)
+
+    assert '"select  # not a comment"' in normalized
+    assert "?limit" in normalized
+    assert "# humans" not in normalized
+
+
+def test_get_limit_offset_ignores_subqueries():
+    assert get_limit_offset(QUERY) == (10, 20)
+    assert get_limit_offset("SELECT * WHERE { { SELECT ?s WHERE { ?s ?p ?o } LIMIT 5 } }") == (
+        None,
+        None,
+    )
+
+
+def test_get_limit_offset_ignores_strings_and_comments():
+    query = 'SELECT * WHERE { ?s ?p "LIMIT 3" } # LIMIT 4\nOFFSET 7'
+    assert get_limit_offset(query) == (None, 7)
+
+
+def test_set_limit_offset_replaces_top_level_modifiers():
+    query = set_limit_offset(QUERY, 50, 100)
+
+    assert get_limit_offset(query) == (50, 100)
+    assert "LIMIT 5 }" in query
+    assert "limit 10" not in query
+
+
+def test_set_limit_offset_drops_zero_offset():
+    assert get_limit_offset(set_limit_offset(QUERY, 10, 0)) == (10, None)
+    assert get_limit_offset(set_limit_offset(QUERY, None)) == (None, None)
+
+
+def test_set_limit_offset_stays_out_of_trailing_comment():
+    query = set_limit_offset("SELECT * WHERE { ?s ?p ?o } # trailing", 5)
+    assert get_limit_offset(query) == (5, None)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT ?type ?super WHERE { wd:Q42 wdt:P31 ?type . ?type wdt:P279* ?super }",
+    "SELECT ?item WHERE { VALUES ?cls { wd:Q515 } ?item wdt:P31/wdt:P279* ?cls }",
+    "SELECT DISTINCT ?item WHERE { ?item wdt:P31 wd:Q5 } LIMIT 10",
+    "SELECT ?p ?o WHERE { wd:Q42 ?p ?o }",
+    "ASK { ?s ?p ?o }",
+])
+def test_analysis_accepts_bound_queries(query):
+    analysis = QueryAnalysis(query)
+    assert analysis.cost == "cheap", analysis.issues
+
+
+def test_analysis_reads_form_and_modifiers():
+    analysis = QueryAnalysis("select ?x where { ?x wdt:P31 wd:Q515 } limit 5 offset 10")
+    assert (analysis.form, analysis.limit, analysis.offset) == ("SELECT", 5, 10)
+
+
+def test_transitive_path_between_unbound_variables_is_prohibitive():
+    analysis = QueryAnalysis("SELECT ?a ?b WHERE { ?a wdt:P279* ?b }")
+
+    assert analysis.cost == "prohibitive"
+    assert "between two unbound variables" in analysis.reasons("prohibitive")[0]
+
+
+def test_full_scan_is_prohibitive_only_when_sorted_or_aggregated():
+    assert QueryAnalysis("SELECT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT 10").cost == "expensive"
+    assert QueryAnalysis("SELECT ?s ?p ?o WHERE { ?s ?p ?o } ORDER BY ?s").cost == "prohibitive"
+
+
+@pytest.mark.parametrize("query, reason", [
+    ("SELECT (COUNT(?x) AS ?n) WHERE { ?x wdt:P31 wd:Q5 }", "every instance of wd:Q5"),
+    ("SELECT ?x WHERE { ?x wdt:P31/wdt:P279* wd:Q5 }", "over wd:Q5, a huge class"),
+    ("SELECT ?x WHERE { ?x wdt:P31 wd:Q515 } LIMIT 10 OFFSET 50000", "OFFSET 50000"),
+])
+def test_analysis_flags_expensive_queries(query, reason):
+    analysis = QueryAnalysis(query)
+
+    assert analysis.cost == "expensive"
+    assert any(reason in message for message in analysis.reasons("expensive"))
+
+
+def test_aggregated_closure_over_huge_class_is_prohibitive():
+    analysis = QueryAnalysis(
+        "SELECT (COUNT(?x) AS ?n) WHERE { ?x wdt:P31/wdt:P279* wd:Q5 }"
+    )
+    assert analysis.cost == "prohibitive"
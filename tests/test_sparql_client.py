@@ -0,0 +1,141 @@
+"""Tests for SPARQL queries and pagination in the Wikidata client."""
+
+import json
+import re
+from typing import Optional
+
+import httpx
+import pytest
+
+from mcp_wikidata.config import Config
+from mcp_wikidata.sparql import decode_cursor, encode_cursor, get_limit_offset
+from mcp_wikidata.wikidata_client import WikidataClient
+
+ENDPOINT = re.compile(r"https://query\.wikidata\.org/sparql\?.*")
+QUERY = "SELECT ?n WHERE { ?n wdt:P31 wd:Q515 }"
+
+
+class FakeWdqs:
+    """Answers SELECT queries with ``total`` numbered rows, sliced by LIMIT/OFFSET."""
+
+    def __init__(self, total: int = 25, chunk_size: Optional[int] = None) -> None:
+        self.total = total
+        self.chunk_size = chunk_size
+        self.queries = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        query = request.url.params["query"]
+        self.queries.append(query)
+        limit, offset = get_limit_offset(query)
+        start = offset or 0
+        end = self.total if limit is None else min(self.total, start + limit)
+        body = json.dumps({
+            "head": {"vars": ["n"]},
+            "results": {"bindings": [
+                {"n": {"type": "literal", "value": str(i)}} for i in range(start, end)
+            ]},
+        }).encode("utf-8")
+        if self.chunk_size is None:
+            return httpx.Response(200, content=body)
+        return httpx.Response(200, content=self._chunks(body))
+
+    async def _chunks(self, body: bytes):
+        for start in range(0, len(body), self.chunk_size):
+            yield body[start:start + self.chunk_size]
+
+
+def _values(result):
+    return [int(row["n"]["value"]) for row in result["results"]["bindings"]]
+
+
+@pytest.fixture
+def wdqs(httpx_mock):
+    wdqs = FakeWdqs()
+    httpx_mock.add_callback(wdqs, url=ENDPOINT, is_reusable=True, is_optional=True)
+    return wdqs
+
+
+@pytest.fixture
+async def client():
+    client = WikidataClient(Config(sparql_guard="enforce"))
+    yield client
+    await client.aclose()
+
+
+async def test_guard_rates_the_query_with_its_default_limit(client, wdqs):
+    result = await client.sparql_query("SELECT DISTINCT ?p WHERE { ?s ?p ?o }")
+
+    assert len(result["results"]["bindings"]) == 25
+    assert get_limit_offset(wdqs.queries[0]) == (100, None)
+
+
+async def test_guard_rejects_prohibitive_query_under_enforce(client, wdqs):
+    with pytest.raises(ValueError, match="Query rejected as too expensive"):
+        await client.sparql_query("SELECT ?s WHERE { ?s ?p ?o } ORDER BY ?s")
+    assert wdqs.queries == []
+
+
+async def test_pages_walk_the_whole_result_set(client, wdqs):
+    pages = [await client.sparql_query(QUERY, page_size=10)]
+    while pages[-1]["page"]["next_cursor"]:
+        pages.append(await client.sparql_query(None, cursor=pages[-1]["page"]["next_cursor"]))
+
+    assert [page["page"]["offset"] for page in pages] == [0, 10, 20]
+    assert [value for page in pages for value in _values(page)] == list(range(25))
+    assert pages[-1]["page"]["next_cursor"] is None
+
+
+async def test_query_limit_and_offset_bound_the_paginated_range(client, wdqs):
+    first = await client.sparql_query(f"{QUERY} LIMIT 7 OFFSET 3", page_size=5)
+    second = await client.sparql_query(None, cursor=first["page"]["next_cursor"])
+
+    assert _values(first) == [3, 4, 5, 6, 7]
+    assert _values(second) == [8, 9]
+    assert second["page"]["next_cursor"] is None
+    assert all(get_limit_offset(query)[0] <= 5 for query in wdqs.queries)
+
+
+async def test_page_cut_short_by_byte_budget_continues_where_it_stopped(httpx_mock):
+    wdqs = FakeWdqs(chunk_size=40)
+    httpx_mock.add_callback(wdqs, url=ENDPOINT, is_reusable=True)
+    client = WikidataClient(Config(sparql_max_bytes=200))
+    try:
+        first = await client.sparql_query(QUERY, page_size=10)
+        read = len(_values(first))
+        assert 0 < read < 10
+        assert first["truncated"] is True
+        assert decode_cursor(first["page"]["next_cursor"])["o"] == read
+
+        second = await client.sparql_query(None, cursor=first["page"]["next_cursor"])
+        assert second["page"]["offset"] == read
+        assert _values(second)[0] == read
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.parametrize("state", [
+    {"q": 1, "o": 0, "n": 10},
+    {"q": QUERY, "o": -1, "n": 10},
+    {"q": QUERY, "o": True, "n": 10},
+    {"q": QUERY, "o": "0", "n": 10},
+    {"q": QUERY, "o": 0, "n": 0},
+    {"q": QUERY, "o": 0, "n": 10, "e": 1.5},
+    {"q": QUERY, "o": 20, "n": 10, "e": 5},
+    {"q": QUERY, "o": 5, "n": 10, "e": 5},
+])
+async def test_forged_cursors_are_rejected(client, wdqs, state):
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        await client.sparql_query(None, cursor=encode_cursor(state))
+    assert wdqs.queries == []
+
+
+async def test_unreadable_cursor_is_rejected(client, wdqs):
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        await client.sparql_query(None, cursor="not-a-cursor")
+
+
+@pytest.mark.parametrize("format", ["csv", "xml"])
+async def test_cursor_requires_json_format(client, wdqs, format):
+    cursor = encode_cursor({"q": QUERY, "o": 10, "n": 10})
+    with pytest.raises(ValueError, match="only supported with the json format"):
+        await client.sparql_query(None, format=format, cursor=cursor)
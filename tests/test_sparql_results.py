@@ -0,0 +1,105 @@
+"""Tests for incremental SPARQL JSON result parsing."""
+
+import json
+
+import pytest
+
+from mcp_wikidata.sparql_results import BindingsParser, SparqlResultStream
+
+
+def _results(count: int) -> bytes:
+    return json.dumps({
+        "head": {"vars": ["item", "label"]},
+        "results": {"bindings": [
+            {
+                "item": {"type": "uri", "value": f"http://www.wikidata.org/entity/Q{i}"},
+                "label": {"type": "literal", "value": f"ité {i}", "xml:lang": "fr"},
+            }
+            for i in range(count)
+        ]},
+    }).encode("utf-8")
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_parser_yields_rows_split_across_chunks():
+    text = _results(3).decode("utf-8")
+    parser = BindingsParser()
+    rows = []
+    for start in range(0, len(text), 7):
+        rows.extend(parser.feed(text[start:start + 7]))
+    parser.close()
+
+    assert parser.vars == ["item", "label"]
+    assert [row["item"]["value"][-2:] for row in rows] == ["Q0", "Q1", "Q2"]
+    assert rows[1]["label"]["value"] == "ité 1"
+
+
+def test_parser_yields_each_row_as_soon_as_it_is_complete():
+    parser = BindingsParser()
+    assert list(parser.feed('{"head":{"vars":["x"]},"results":{"bindings":[{"x":')) == []
+    assert list(parser.feed('{"type":"literal","value":"1"}},{"x":')) == [
+        {"x": {"type": "literal", "value": "1"}}
+    ]
+
+
+def test_parser_reads_ask_results():
+    parser = BindingsParser()
+    assert list(parser.feed('{"head":{},"boolean":true}')) == []
+    parser.close()
+    assert parser.boolean is True
+
+
+def test_parser_rejects_truncated_bindings():
+    parser = BindingsParser()
+    list(parser.feed('{"head":{"vars":["x"]},"results":{"bindings":[{"x":{"type":"literal"'))
+    with pytest.raises(ValueError, match="truncated"):
+        parser.close()
+
+
+def test_parser_rejects_malformed_bindings():
+    parser = BindingsParser()
+    with pytest.raises(ValueError, match="expected bindings array"):
+        list(parser.feed('{"results":{"bindings":{}}}'))
+
+
+async def test_stream_collects_whole_response_within_budgets():
+    stream = SparqlResultStream(_chunks(_results(5), 10), max_rows=5, max_bytes=1_000_000)
+    result = await stream.collect()
+
+    assert result["head"] == {"vars": ["item", "label"]}
+    assert len(result["results"]["bindings"]) == 5
+    assert "truncated" not in result
+
+
+async def test_stream_stops_at_row_budget():
+    stream = SparqlResultStream(_chunks(_results(10), 10), max_rows=3)
+    result = await stream.collect()
+
+    assert len(result["results"]["bindings"]) == 3
+    assert result["truncated"] is True
+
+
+async def test_stream_stops_reading_at_byte_budget():
+    data = _results(1000)
+    stream = SparqlResultStream(_chunks(data, 100), max_bytes=500)
+    result = await stream.collect()
+
+    assert result["truncated"] is True
+    assert 0 < len(result["results"]["bindings"]) < 1000
+    assert stream.received < len(data)
+
+
+async def test_stream_decodes_multibyte_characters_split_across_chunks():
+    stream = SparqlResultStream(_chunks(_results(2), 1))
+    result = await stream.collect()
+
+    assert [row["label"]["value"] for row in result["results"]["bindings"]] == ["ité 0", "ité 1"]
+
+
+async def test_stream_collects_ask_result():
+    stream = SparqlResultStream(_chunks(b'{"head":{},"boolean":false}', 4))
+    assert await stream.collect() == {"head": {"vars": []}, "boolean": False}
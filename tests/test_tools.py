@@ -0,0 +1,110 @@
+"""Tests for tool call deadlines and cancellation."""
+
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+
+from mcp_wikidata.config import Config
+from mcp_wikidata.tools import WikidataTools
+
+API = re.compile(r"https://www\.wikidata\.org/w/api\.php\?.*")
+
+
+class SlowWikibase:
+    """Answers ``wbgetentities`` once released, counting cancelled requests."""
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.requests = 0
+        self.cancelled = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return httpx.Response(200, json={"entities": {"Q42": {
+            "id": "Q42", "type": "item", "lastrevid": 1, "labels": {}, "claims": {},
+        }}})
+
+
+@pytest.fixture
+def wikibase(httpx_mock):
+    wikibase = SlowWikibase()
+    httpx_mock.add_callback(wikibase, url=API, is_reusable=True, is_optional=True)
+    return wikibase
+
+
+@pytest.fixture
+async def tools():
+    tools = WikidataTools(Config())
+    yield tools
+    await tools.client.aclose()
+
+
+def _call(tools, timeout_ms=None):
+    arguments = {"entity_id": "Q42"}
+    if timeout_ms is not None:
+        arguments["timeout_ms"] = timeout_ms
+    return asyncio.create_task(tools.call_tool("get_entity", arguments))
+
+
+async def test_deadline_is_reported_and_counted(tools, wikibase):
+    result = await _call(tools, timeout_ms=50)
+
+    assert result[0].text == "Error executing get_entity: deadline of 50 ms exceeded"
+    assert tools.get_stats()["calls"] == {"cancelled": 0, "deadline_exceeded": 1}
+
+
+async def test_coalesced_call_outlives_the_shorter_deadline(tools, wikibase):
+    short = _call(tools, timeout_ms=50)
+    patient = _call(tools)
+    assert "deadline of 50 ms exceeded" in (await short)[0].text
+
+    wikibase.release.set()
+    result = json.loads((await patient)[0].text)
+
+    assert result["entity"]["id"] == "Q42"
+    assert (wikibase.requests, wikibase.cancelled) == (1, 0)
+
+
+async def test_upstream_request_is_cancelled_with_its_last_caller(tools, wikibase):
+    calls = [_call(tools, timeout_ms=50), _call(tools, timeout_ms=200)]
+    await asyncio.gather(*calls)
+    await asyncio.sleep(0.01)
+
+    stats = tools.get_stats()
+    assert stats["calls"]["deadline_exceeded"] == 2
+    assert stats["coalescing"]["abandoned"] == 1
+    assert (wikibase.requests, wikibase.cancelled) == (1, 1)
+
+
+async def test_client_cancellation_is_counted(tools, wikibase):
+    call = _call(tools)
+    await asyncio.sleep(0.01)
+    call.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert tools.get_stats()["calls"] == {"cancelled": 1, "deadline_exceeded": 0}
+
+
+async def test_scheduler_slot_is_released_after_a_timeout(wikibase):
+    tools = WikidataTools(Config(max_concurrent_calls=1))
+    try:
+        await _call(tools, timeout_ms=50)
+
+        scheduler = tools.get_stats()["scheduler"]
+        assert (scheduler["running"], scheduler["queue_depth"]) == (0, 0)
+
+        # The single worker slot is free again for the next call.
+        wikibase.release.set()
+        result = json.loads((await _call(tools, timeout_ms=1000))[0].text)
+        assert result["entity"]["id"] == "Q42"
+    finally:
+        await tools.client.aclose()
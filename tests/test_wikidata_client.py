@@ -0,0 +1,164 @@
+"""Tests for entity loading in the Wikidata client."""
+
+import re
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from mcp_wikidata import cache as cache_module
+from mcp_wikidata.config import Config
+from mcp_wikidata.wikidata_client import WikidataClient
+
+API = re.compile(r"https://www\.wikidata\.org/w/api\.php\?.*")
+
+
+class FakeWikibase:
+    """Answers ``wbgetentities`` and ``prop=info`` requests for a few items."""
+
+    def __init__(self) -> None:
+        self.revisions = {"Q1": 1, "Q2": 1, "Q42": 1}
+        self.revision_check_status = 200
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if params["action"] == "query":
+            if self.revision_check_status != 200:
+                return httpx.Response(self.revision_check_status)
+            pages = [
+                {"title": title, "lastrevid": self.revisions[title]}
+                for title in params["titles"].split("|")
+            ]
+            return httpx.Response(200, json={"query": {"pages": pages}})
+        languages = params["languages"].split("|")
+        return httpx.Response(200, json={"entities": {
+            entity_id: self.entity(entity_id, languages)
+            for entity_id in params["ids"].split("|")
+        }})
+
+    def entity(self, entity_id, languages):
+        return {
+            "id": entity_id,
+            "type": "item",
+            "lastrevid": self.revisions[entity_id],
+            "labels": {
+                language: {"language": language, "value": f"{entity_id} {language}"}
+                for language in languages
+            },
+            "descriptions": {},
+            "aliases": {},
+            "claims": {},
+        }
+
+
+def _labels(entity):
+    return {language: term["value"] for language, term in entity["labels"].items()}
+
+
+def _requests(httpx_mock):
+    return [dict(request.url.params) for request in httpx_mock.get_requests()]
+
+
+def _expire_cache(monkeypatch):
+    later = time.monotonic() + 10 ** 6
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: later))
+
+
+@pytest.fixture
+def wikibase(httpx_mock):
+    wikibase = FakeWikibase()
+    httpx_mock.add_callback(wikibase, url=API, is_reusable=True)
+    return wikibase
+
+
+@pytest.fixture
+async def client():
+    client = WikidataClient(Config())
+    yield client
+    await client.aclose()
+
+
+async def test_missing_language_is_completed_with_terms_only_request(client, wikibase, httpx_mock):
+    await client.get_entity("Q42", language="en")
+    result = await client.get_entity("Q42", language=["en", "fr"])
+
+    assert _labels(result["entity"]) == {"en": "Q42 en", "fr": "Q42 fr"}
+    requests = _requests(httpx_mock)
+    assert len(requests) == 2
+    assert requests[1]["languages"] == "fr"
+    assert requests[1]["props"] == "labels|descriptions|aliases|info"
+
+
+async def test_completed_entry_serves_every_language_from_cache(client, wikibase, httpx_mock):
+    await client.get_entity("Q42", language="en")
+    await client.get_entity("Q42", language=["en", "fr"])
+    result = await client.get_entity("Q42", language="fr")
+
+    assert _labels(result["entity"]) == {"fr": "Q42 fr"}
+    assert len(httpx_mock.get_requests()) == 2
+
+
+async def test_new_and_partial_entities_are_fetched_separately(client, wikibase, httpx_mock):
+    await client.get_entities(["Q1", "Q2"], language="en")
+    result = await client.get_entities(["Q1", "Q2", "Q42"], language=["en", "de"])
+
+    assert {_labels(entity)["de"] for entity in result["entities"].values()} == {
+        "Q1 de", "Q2 de", "Q42 de"
+    }
+    requests = _requests(httpx_mock)[1:]
+    full = next(request for request in requests if "props" not in request)
+    terms = next(request for request in requests if "props" in request)
+    assert (full["ids"], full["languages"]) == ("Q42", "en|de")
+    assert (terms["ids"], terms["languages"]) == ("Q1|Q2", "de")
+
+
+async def test_unchanged_expired_entity_is_revalidated_not_refetched(
+    client, wikibase, httpx_mock, monkeypatch
+):
+    await client.get_entity("Q42")
+    _expire_cache(monkeypatch)
+    result = await client.get_entity("Q42")
+
+    assert _labels(result["entity"]) == {"en": "Q42 en"}
+    requests = _requests(httpx_mock)
+    assert [request["action"] for request in requests] == ["wbgetentities", "query"]
+    assert requests[1]["titles"] == "Q42"
+    assert client.get_stats()["revalidation"] == {"checked": 1, "unchanged": 1}
+
+
+async def test_changed_expired_entity_is_refetched(client, wikibase, httpx_mock, monkeypatch):
+    await client.get_entity("Q42")
+    _expire_cache(monkeypatch)
+    wikibase.revisions["Q42"] = 2
+    await client.get_entity("Q42")
+
+    actions = [request["action"] for request in _requests(httpx_mock)]
+    assert actions == ["wbgetentities", "query", "wbgetentities"]
+    assert client.get_stats()["revalidation"] == {"checked": 1, "unchanged": 0}
+
+
+async def test_failed_revision_check_falls_back_to_refetch(
+    client, wikibase, httpx_mock, monkeypatch
+):
+    await client.get_entity("Q42")
+    _expire_cache(monkeypatch)
+    wikibase.revision_check_status = 404
+    result = await client.get_entity("Q42")
+
+    assert result["entity"]["id"] == "Q42"
+    actions = [request["action"] for request in _requests(httpx_mock)]
+    assert actions == ["wbgetentities", "query", "wbgetentities"]
+
+
+async def test_revalidation_can_be_disabled(wikibase, httpx_mock, monkeypatch):
+    client = WikidataClient(Config(revalidate=False))
+    try:
+        await client.get_entity("Q42")
+        _expire_cache(monkeypatch)
+        await client.get_entity("Q42")
+    finally:
+        await client.aclose()
+
+    actions = [request["action"] for request in _requests(httpx_mock)]
+    assert actions == ["wbgetentities", "wbgetentities"]